@@ -0,0 +1,34 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
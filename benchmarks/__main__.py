@@ -0,0 +1,73 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import sys
+
+DESCRIPTION = 'Runs every benchmark and writes the results as JSON, so they can be compared across releases.'
+EPILOG = 'Run from the repository root.'
+BENCHMARKS = ['bench_packets', 'bench_v2_encoder', 'bench_v2_decoder', 'bench_sensors', 'bench_end_to_end']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=DESCRIPTION, epilog=EPILOG)
+    parser.add_argument('names', nargs='*', metavar='name', help=f'benchmarks to run, all by default: {BENCHMARKS}')
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help='JSON file to write')
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks {sorted(unknown)}')
+
+    report = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+    for name in args.names or BENCHMARKS:
+        print(f'== {name}')
+        report['results'][name] = importlib.import_module(f'benchmarks.{name}').main()
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
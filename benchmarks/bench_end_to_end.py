@@ -0,0 +1,111 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+"""End-to-end throughput and latency against the simulated adapter: commands per second, blocking and pipelined,
+command round trip latency, and the latency from a notification reaching the toy to its sensor data listener.
+
+Run from the repository root: ``python -m benchmarks.bench_end_to_end``"""
+
+import threading
+import time
+from collections import deque
+
+from benchmarks.common import percentiles
+from sphero_unsw.adapter.sim_adapter import get_sim_adapter, INSTANT
+from sphero_unsw.scanner import find_toy
+
+
+def timed_adapter(timing):
+    """Simulated adapter stamping every sensor streaming notification as it is handed to the toy."""
+    sim_adapter = get_sim_adapter(['BP-0001'], timing, seed=0)
+
+    class TimedAdapter(sim_adapter):
+        stamps = deque()
+
+        def set_callback(self, uuid, cb):
+            def stamped(char, data):
+                if data[2:4] == b'\x18\x02':
+                    self.stamps.append(time.perf_counter())
+                cb(char, data)
+
+            super().set_callback(uuid, stamped)
+
+    return TimedAdapter
+
+
+def main(commands=300, samples=200, timing=INSTANT):
+    results = {}
+    adapter = timed_adapter(timing)
+    toy = find_toy(toy_name='BP-0001', adapter=adapter)
+    with toy:
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(commands):
+            sent = time.perf_counter()
+            toy.wake()
+            latencies.append((time.perf_counter() - sent) * 1e3)
+        results['blocking_commands_per_s'] = commands / (time.perf_counter() - start)
+        results['command_latency_ms'] = {'mean': sum(latencies) / len(latencies), **percentiles(latencies, 50, 99)}
+
+        start = time.perf_counter()
+        with toy.pipelined():
+            for _ in range(commands):
+                toy.wake()
+        results['pipelined_commands_per_s'] = commands / (time.perf_counter() - start)
+
+        delays = []
+        done = threading.Event()
+
+        def listener(_):
+            if adapter.stamps:
+                delays.append((time.perf_counter() - adapter.stamps.popleft()) * 1e3)
+            if len(delays) >= samples:
+                done.set()
+
+        toy.sensor_control.add_sensor_data_listener(listener)
+        toy.sensor_control.set_interval(10)
+        toy.sensor_control.enable('accelerometer', 'gyroscope', 'locator')
+        done.wait(samples * .05 + 5)
+        toy.sensor_control.disable_all()
+        results['notification_latency_ms'] = {'mean': sum(delays) / max(1, len(delays)),
+                                              **percentiles(delays or [0.], 50, 99)}
+
+    for key, value in results.items():
+        print(f'{key:>26}: {value}')
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+"""Packet encoding and decoding, for protocol v1 and v2, including ``Collector.add`` on input split into 20-byte
+notifications.
+
+Run from the repository root: ``python -m benchmarks.bench_packets``"""
+
+import random
+import struct
+
+from benchmarks.common import measure
+from sphero_unsw.controls import v1, v2
+
+
+def make_v2_packets(count=200, seed=0):
+    rng = random.Random(seed)
+    manager = v2.Packet.Manager()
+    return [manager.new_packet(rng.choice((22, 26, 24)), rng.randrange(64), rng.choice((None, 0x11, 0x12)),
+                               bytes(rng.randrange(256) for _ in range(rng.choice((0, 4, 8, 16, 48)))))
+            for _ in range(count)]
+
+
+def make_v1_packets(count=200, seed=0):
+    rng = random.Random(seed)
+    manager = v1.Packet.Manager()
+    return [manager.new_packet(2, rng.randrange(64), None, bytes(rng.randrange(256) for _ in range(rng.choice((0, 4, 8)))))
+            for _ in range(count)]
+
+
+def v2_stream(count=500, seed=0):
+    rng = random.Random(seed)
+    stream = bytearray()
+    for seq in range(count):
+        values = struct.pack('>12f', *(rng.uniform(-2000, 2000) for _ in range(12)))
+        stream += v2.Packet(v2.Packet.Flags.is_activity, 24, 2, 0xff, None, None, bytearray(values)).build()
+    return [bytes(stream[i:i + 20]) for i in range(0, len(stream), 20)]
+
+
+def v1_stream(count=500, seed=0):
+    rng = random.Random(seed)
+    stream = bytearray()
+    for seq in range(count):
+        data = struct.pack('>12h', *(rng.randrange(-2000, 2000) for _ in range(12)))
+        stream += v1.Packet.Async(3, bytearray(data)).build()
+    return [bytes(stream[i:i + 20]) for i in range(0, len(stream), 20)]
+
+
+def collect(collector_cls, chunks):
+    collector = collector_cls(lambda _: None)
+    for chunk in chunks:
+        collector.add(bytearray(chunk))
+
+
+def main(number=20):
+    results = {}
+    v2_packets = make_v2_packets()
+    v2_frames = [p.build() for p in v2_packets]
+    results['v2_build_us'] = measure(lambda: [p.build() for p in v2_packets], number) / len(v2_packets)
+    results['v2_parse_us'] = measure(lambda: [v2.Packet.parse_response(f) for f in v2_frames], number) / len(v2_frames)
+
+    v1_packets = make_v1_packets()
+    v1_responses = [v1.Packet.Response(v1.Packet.Error.command_succeeded, p.seq, p.data).build()[2:]
+                    for p in v1_packets]
+    results['v1_build_us'] = measure(lambda: [p.build() for p in v1_packets], number) / len(v1_packets)
+    results['v1_parse_us'] = measure(lambda: [v1.Packet.parse_response(bytearray(r)) for r in v1_responses],
+                                     number) / len(v1_responses)
+
+    for name, module, chunks, count in (('v2', v2, v2_stream(), 500), ('v1', v1, v1_stream(), 500)):
+        results[f'{name}_collector_us'] = measure(lambda: collect(module.Packet.Collector, chunks), number) / count
+
+    for key, value in results.items():
+        print(f'{key:>20}: {value:8.2f}')
+    return results
+
+
+if __name__ == '__main__':
+    main()
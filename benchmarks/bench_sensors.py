@@ -0,0 +1,106 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+"""Sensor data decoding, from notification frames to listeners, and the Sphero Edu API work done on every sample and
+when registering matrix animations.
+
+Run from the repository root: ``python -m benchmarks.bench_sensors``"""
+
+import random
+import struct
+
+from benchmarks.common import measure, offline_toy
+from sphero_unsw.controls.v2 import Packet
+from sphero_unsw.listeners.sensor import StreamingServiceData
+from sphero_unsw.sphero_edu import SpheroEduAPI
+from sphero_unsw.toy.boltplus import BOLTPLUS
+from sphero_unsw.toy.rvr import RVR
+from sphero_unsw.types import Color
+
+BOLTPLUS_SENSORS = ['accelerometer', 'attitude', 'gyroscope', 'locator', 'velocity', 'quaternion']
+RVR_SENSORS = ['accelerometer', 'gyroscope', 'imu', 'locator', 'velocity', 'color_detection']
+
+
+def sensor_control_frames(toy, count=200, seed=0):
+    rng = random.Random(seed)
+    size = sum(len(toy.sensors.get(s, toy.extended_sensors.get(s, ()))) for s in BOLTPLUS_SENSORS)
+    return [Packet(Packet.Flags.is_activity, 24, 2, 0xff, None, None,
+                   bytearray(struct.pack('>%df' % size, *(rng.uniform(-1, 1) for _ in range(size))))).build()
+            for _ in range(count)]
+
+
+def main(number=20):
+    results = {}
+    samples = []
+
+    toy = offline_toy(BOLTPLUS)
+    control = toy.sensor_control
+    control.add_sensor_data_listener(samples.append)
+    control.enable(*BOLTPLUS_SENSORS)
+    frames = sensor_control_frames(toy)
+    api_read = toy._Toy__api_read
+
+    def feed():
+        for frame in frames:
+            api_read(None, frame)
+
+    results['sensor_control_us'] = measure(feed, number) / len(frames)
+
+    rvr = offline_toy(RVR, 'RV-0001')
+    streaming = rvr.sensor_control
+    streaming.add_sensor_data_listener(lambda _: None)
+    streaming.enable(*RVR_SENSORS)
+    decode = streaming._StreamingControl__streaming_service_data
+    rng = random.Random(0)
+    data = [(target, StreamingServiceData(token, bytes(rng.randrange(256) for _ in range(24))))
+            for target in (1, 2) for token in (1, 2)]
+    results['streaming_control_us'] = measure(lambda: [decode(*d) for d in data], number * 50) / len(data)
+
+    api = SpheroEduAPI(offline_toy(BOLTPLUS))
+    sample = samples[-1]
+    results['edu_sensor_listener_us'] = measure(lambda: api._sensor_data_listener(sample), number * 50)
+
+    frames_8x8 = [[[(row + col + i) % 16 for col in range(8)] for row in range(8)] for i in range(8)]
+    palette = [Color(i * 16, 255 - i * 16, i * 8) for i in range(16)]
+    results['register_matrix_animation_us'] = measure(
+        lambda: api.register_matrix_animation(frames_8x8, palette, 10, False), number)
+
+    for key, value in results.items():
+        print(f'{key:>30}: {value:8.2f}')
+    return results
+
+
+if __name__ == '__main__':
+    main()
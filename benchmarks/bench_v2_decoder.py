@@ -0,0 +1,131 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+"""Compares the protocol v2 ``Packet.Collector`` against the previous list-based decoder on fragmented input.
+
+Run from the repository root: ``python -m benchmarks.bench_v2_decoder``"""
+
+import random
+import struct
+import timeit
+
+from sphero_unsw.controls import PacketDecodingException
+from sphero_unsw.controls.v2 import Packet
+from sphero_unsw.helper import packet_chk
+
+
+class LegacyCollector:
+    """Decoder as it was before the buffer-based ``Packet.Collector``, kept for comparison."""
+
+    def __init__(self, callback):
+        self.__callback = callback
+        self.__data = []
+
+    def add(self, data):
+        for b in data:
+            self.__data.append(b)
+            if b == Packet.Encoding.end:
+                pkt = self.__data
+                self.__data = []
+                if len(pkt) < 6:
+                    raise PacketDecodingException(f'Very small packet {[hex(x) for x in pkt]}')
+                self.__callback(self.parse_response(pkt))
+
+    @staticmethod
+    def parse_response(data):
+        sop, *data, eop = data
+        raw_data = []
+        iter_response_data = iter(data)
+        for b in iter_response_data:
+            if b == Packet.Encoding.escape:
+                b = next(iter_response_data, None)
+                if b == Packet.Encoding.escaped_escape:
+                    b = Packet.Encoding.escape
+                elif b == Packet.Encoding.escaped_start:
+                    b = Packet.Encoding.start
+                elif b == Packet.Encoding.escaped_end:
+                    b = Packet.Encoding.end
+            raw_data.append(b)
+        *data, chk = raw_data
+        if packet_chk(data) != chk:
+            raise PacketDecodingException('Bad response checksum')
+        flags = data.pop(0)
+        tid = sid = None
+        if flags & Packet.Flags.has_target_id:
+            tid = data.pop(0)
+        if flags & Packet.Flags.has_source_id:
+            sid = data.pop(0)
+        did, cid, seq, *data = data
+        err = Packet.Error.success
+        if flags & Packet.Flags.is_response:
+            err = Packet.Error(data.pop(0))
+        return Packet(flags, did, cid, seq, tid, sid, bytearray(data), err)
+
+
+def make_stream(count=1000, seed=0):
+    """Sensor streaming notifications of nine float groups, split into 20-byte BLE notifications."""
+    rng = random.Random(seed)
+    stream = bytearray()
+    for seq in range(count):
+        values = [rng.uniform(-2000, 2000) for _ in range(20)]
+        stream += Packet(Packet.Flags.is_activity | Packet.Flags.has_source_id | Packet.Flags.has_target_id,
+                         24, 2, seq & 0xff, 0x11, 0x01, bytearray(struct.pack('>20f', *values))).build()
+    return [bytes(stream[i:i + 20]) for i in range(0, len(stream), 20)]
+
+
+def run(collector_cls, chunks):
+    packets = []
+    collector = collector_cls(packets.append)
+    for chunk in chunks:
+        collector.add(chunk)
+    return packets
+
+
+def main(number=20):
+    chunks = make_stream()
+    legacy = run(LegacyCollector, chunks)
+    current = run(Packet.Collector, chunks)
+    assert [bytes(p.data) for p in legacy] == [bytes(p.data) for p in current]
+    results = {}
+    for name, cls in (('legacy', LegacyCollector), ('current', Packet.Collector)):
+        seconds = min(timeit.repeat(lambda: run(cls, chunks), number=number, repeat=3)) / number
+        results[name] = seconds
+        print(f'{name:>8}: {seconds * 1e6 / len(current):8.2f} us/packet')
+    print(f' speedup: {results["legacy"] / results["current"]:.1f}x')
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+"""Compares protocol v2 ``Packet.build`` against the previous per-byte encoder.
+
+Run from the repository root: ``python -m benchmarks.bench_v2_encoder``"""
+
+import timeit
+
+from sphero_unsw.controls.v2 import Packet
+from sphero_unsw.helper import packet_chk
+
+
+def legacy_build(packet: Packet) -> bytearray:
+    """Encoder as it was before the table-based ``Packet.build``, kept for comparison."""
+    raw = bytearray([packet.flags])
+    if packet.flags & Packet.Flags.has_target_id:
+        raw.append(packet.tid)
+    if packet.flags & Packet.Flags.has_source_id:
+        raw.append(packet.sid)
+    raw.extend(packet.id)
+    if packet.flags & Packet.Flags.is_response:
+        raw.append(packet.err)
+    raw.extend(packet.data)
+    raw.append(packet_chk(raw))
+
+    escaped_packet = bytearray([Packet.Encoding.start])
+    for c in raw:
+        if c == Packet.Encoding.escape:
+            escaped_packet.extend((Packet.Encoding.escape, Packet.Encoding.escaped_escape))
+        elif c == Packet.Encoding.start:
+            escaped_packet.extend((Packet.Encoding.escape, Packet.Encoding.escaped_start))
+        elif c == Packet.Encoding.end:
+            escaped_packet.extend((Packet.Encoding.escape, Packet.Encoding.escaped_end))
+        else:
+            escaped_packet.append(c)
+    escaped_packet.append(Packet.Encoding.end)
+    return escaped_packet
+
+
+def make_packets():
+    flags = Packet.Flags.requests_response | Packet.Flags.is_activity | Packet.Flags.has_target_id | \
+            Packet.Flags.has_source_id
+    return {
+        'drive_with_heading': [Packet(flags, 22, 7, seq, 0x12, 0x01, bytearray([0, 0, 90, 0])) for seq in range(255)],
+        'ping': [Packet(flags, 16, 0, seq, 0x11, 0x01, bytearray()) for seq in range(255)],
+        'matrix_frame': [Packet(flags, 26, 48, seq, 0x12, 0x01, bytearray(range(seq % 8, seq % 8 + 34)))
+                         for seq in range(255)],
+    }
+
+
+def main(number=200):
+    results = {}
+    for name, packets in make_packets().items():
+        assert all(p.build() == legacy_build(p) for p in packets)
+        legacy = min(timeit.repeat(lambda: [legacy_build(p) for p in packets], number=number, repeat=3))
+        current = min(timeit.repeat(lambda: [p.build() for p in packets], number=number, repeat=3))
+        scale = 1e6 / number / len(packets)
+        results[name] = {'legacy': legacy * scale, 'current': current * scale}
+        print(f'{name:>18}: legacy {legacy * scale:6.2f} us, current {current * scale:6.2f} us, '
+              f'speedup {legacy / current:.1f}x')
+    return results
+
+
+if __name__ == '__main__':
+    main()
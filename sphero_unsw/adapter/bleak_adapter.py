@@ -35,47 +35,371 @@
 
 import asyncio
 import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
 
 import bleak
 
 
+class BleRuntimeStats(NamedTuple):
+    devices: int
+    pending: int
+    max_pending: int
+    operations: int
+    errors: int
+    queue_depths: Dict[str, int]
+
+
+class BleRuntime:
+    """Event loop thread shared by every BLE scan and connection of the process.
+
+    Operations on the same device run one at a time and in order, different devices are served concurrently. Scans
+    run one at a time, and at most ``max_connecting`` connection attempts are made at once, since most HCI
+    controllers refuse more."""
+
+    __default = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, max_connecting: int = 2):
+        self.max_connecting = max_connecting
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, name='BleRuntime', daemon=True)
+        self.__thread.start()
+        self.__lock = threading.Lock()
+        self.__depths = {}
+        self.__pending = self.__max_pending = self.__operations = self.__errors = 0
+        self.__device_locks = {}
+        self.__scan_lock = self.__connecting = None
+
+    @classmethod
+    def default(cls) -> 'BleRuntime':
+        """Runtime shared by all adapters that are not given one."""
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+    def execute(self, coroutine, address=None):
+        """Runs the coroutine on the runtime loop and waits for its result. Coroutines of the same ``address`` are
+        run in submission order."""
+        with self.__lock:
+            if address in self.__depths:
+                self.__depths[address] += 1
+            self.__pending += 1
+            self.__max_pending = max(self.__max_pending, self.__pending)
+        future = asyncio.run_coroutine_threadsafe(self.__run(coroutine, address), self.__loop)
+        try:
+            return future.result()
+        except BaseException:
+            with self.__lock:
+                self.__errors += 1
+            raise
+        finally:
+            with self.__lock:
+                if address in self.__depths:
+                    self.__depths[address] -= 1
+                self.__pending -= 1
+                self.__operations += 1
+
+    async def __run(self, coroutine, address):
+        if address is None:
+            return await coroutine
+        lock = self.__device_locks.get(address)
+        if lock is None:
+            lock = self.__device_locks[address] = asyncio.Lock()
+        async with lock:
+            return await coroutine
+
+    def scan(self, coroutine):
+        return self.execute(self.__scan(coroutine))
+
+    async def __scan(self, coroutine):
+        if self.__scan_lock is None:
+            self.__scan_lock = asyncio.Lock()
+        async with self.__scan_lock:
+            return await coroutine
+
+    def connect(self, client: bleak.BleakClient, address):
+        return self.execute(self.__connect(client), address)
+
+    async def __connect(self, client):
+        if self.__connecting is None:
+            self.__connecting = asyncio.Semaphore(self.max_connecting)
+        async with self.__connecting:
+            return await client.connect()
+
+    def register(self, address):
+        """Starts tracking the queue depth of a device."""
+        with self.__lock:
+            self.__depths.setdefault(address, 0)
+
+    def release(self, address):
+        """Forgets a device once its adapter is closed."""
+        with self.__lock:
+            self.__depths.pop(address, None)
+        self.__loop.call_soon_threadsafe(self.__device_locks.pop, address, None)
+
+    def stats(self) -> BleRuntimeStats:
+        with self.__lock:
+            return BleRuntimeStats(len(self.__depths), self.__pending, self.__max_pending, self.__operations,
+                                   self.__errors, dict(self.__depths))
+
+    def stop(self):
+        """Stops the loop thread. Only meant for runtimes created explicitly, the default one lives as long as the
+        process."""
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+
+
+class Advertisement(NamedTuple):
+    name: Optional[str]
+    address: str
+    rssi: int
+    last_seen: float
+    device: object
+
+
+class BackgroundScanner:
+    """Long-lived scanner remembering the devices advertised during the last ``ttl`` seconds.
+
+    While it runs, scans of :class:`BleakAdapter` are answered from what it has seen: looking for a name returns as
+    soon as the name has been seen, and listing all toys returns as soon as the scanner has been running for the
+    scan timeout."""
+
+    def __init__(self, ttl: float = 30., runtime: BleRuntime = None):
+        self.ttl = ttl
+        self.__runtime = runtime or BleRuntime.default()
+        self.__scanner = None
+        self.__started_at = None
+        self.__seen = {}
+        self.__cond = threading.Condition()
+
+    @property
+    def running(self) -> bool:
+        return self.__scanner is not None
+
+    def start(self) -> 'BackgroundScanner':
+        if self.__scanner is None:
+            self.__scanner = self.__runtime.execute(self.__start())
+            self.__started_at = time.monotonic()
+        return self
+
+    async def __start(self):
+        scanner = bleak.BleakScanner(self.__on_detection)
+        await scanner.start()
+        return scanner
+
+    def stop(self):
+        scanner, self.__scanner = self.__scanner, None
+        if scanner is not None:
+            self.__runtime.execute(scanner.stop())
+        with self.__cond:
+            self.__seen.clear()
+
+    def __on_detection(self, device, advertisement):
+        with self.__cond:
+            self.__seen[device.address] = Advertisement(advertisement.local_name or device.name, device.address,
+                                                        advertisement.rssi, time.monotonic(), device)
+            self.__cond.notify_all()
+
+    def __fresh(self) -> List[Advertisement]:
+        expiry = time.monotonic() - self.ttl
+        for address in [a for a, seen in self.__seen.items() if seen.last_seen < expiry]:
+            del self.__seen[address]
+        return list(self.__seen.values())
+
+    def devices(self) -> List[Advertisement]:
+        """Devices advertised during the last ``ttl`` seconds."""
+        with self.__cond:
+            return self.__fresh()
+
+    def wait(self, found: Callable[[List[Advertisement]], bool] = None, timeout: float = 5.0) -> List[Advertisement]:
+        """Waits until ``found`` accepts the devices seen, or without ``found``, until the scanner has been running for
+        ``timeout`` seconds, then returns the devices seen."""
+        if self.__scanner is None:
+            raise RuntimeError('Background scanner is not running')
+        deadline = time.monotonic() + timeout
+        if found is None:
+            deadline = min(deadline, self.__started_at + timeout)
+        with self.__cond:
+            while True:
+                devices = self.__fresh()
+                remaining = deadline - time.monotonic()
+                if (found is not None and found(devices)) or remaining <= 0:
+                    return devices
+                self.__cond.wait(remaining)
+
+
+class WriteMode(NamedTuple):
+    without_response: bool
+    size: int
+
+
+class WriteFlow:
+    """Chooses how data is written to each characteristic of a connected client.
+
+    Characteristics accepting write-without-response are written that way, in chunks as large as the MTU allows. To
+    avoid overrunning the toy, every ``max_unacked`` bytes one write still asks for a response, which only returns once
+    the toy has taken everything written before it."""
+
+    max_unacked = 240
+
+    def __init__(self, client: bleak.BleakClient):
+        self.__client = client
+        self.__modes = {}
+        self.__unacked = 0
+
+    def mode(self, uuid) -> WriteMode:
+        mode = self.__modes.get(uuid)
+        if mode is None:
+            char = self.__client.services.get_characteristic(uuid)
+            if char is None:
+                mode = WriteMode(False, 20)
+            elif 'write-without-response' in char.properties:
+                mode = WriteMode(True, max(20, char.max_write_without_response_size))
+            else:
+                mode = WriteMode(False, max(20, self.__client.mtu_size - 3))
+            self.__modes[uuid] = mode
+        return mode
+
+    def response(self, uuid, size: int) -> bool:
+        """Whether the next write of ``size`` bytes to ``uuid`` has to wait for a response."""
+        if not self.mode(uuid).without_response:
+            return True
+        self.__unacked += size
+        if self.__unacked >= self.max_unacked:
+            self.__unacked = 0
+            return True
+        return False
+
+
 class BleakAdapter:
+    """Handle onto a device connected through a :class:`BleRuntime`, the process-wide one by default."""
+
+    scanner: Optional[BackgroundScanner] = None
+
+    @staticmethod
+    def start_background_scanner(ttl: float = 30.) -> BackgroundScanner:
+        """Keeps scanning in the background, answering later scans from the devices recently seen."""
+        if BleakAdapter.scanner is None:
+            BleakAdapter.scanner = BackgroundScanner(ttl).start()
+        return BleakAdapter.scanner
+
+    @staticmethod
+    def stop_background_scanner():
+        scanner, BleakAdapter.scanner = BleakAdapter.scanner, None
+        if scanner is not None:
+            scanner.stop()
+
     @staticmethod
     def scan_toys(timeout: float = 5.0):
-        return asyncio.run(bleak.BleakScanner.discover(timeout))
+        if BleakAdapter.scanner is not None:
+            return [seen.device for seen in BleakAdapter.scanner.wait(timeout=timeout)]
+        return BleRuntime.default().scan(bleak.BleakScanner.discover(timeout))
+
+    @staticmethod
+    def scan_toys_until(found: Callable[[List], bool], timeout: float = 5.0):
+        """Scans until ``found`` accepts the devices seen so far, or the timeout expires."""
+        if BleakAdapter.scanner is not None:
+            devices = BleakAdapter.scanner.wait(lambda seen: found([d.device for d in seen]), timeout)
+            return [seen.device for seen in devices]
+        return BleRuntime.default().scan(BleakAdapter.__scan_until(found, timeout))
+
+    @staticmethod
+    async def __scan_until(found, timeout):
+        devices = {}
+        done = asyncio.Event()
+
+        def detection(device, _):
+            devices[device.address] = device
+            if not done.is_set() and found(list(devices.values())):
+                done.set()
+
+        async with bleak.BleakScanner(detection):
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(devices.values())
 
     @staticmethod
     def scan_toy(name: str, timeout: float = 5.0):
-        return asyncio.run(
+        if BleakAdapter.scanner is not None:
+            devices = BleakAdapter.scanner.wait(lambda seen: any(d.name == name for d in seen), timeout)
+            return next((d.device for d in devices if d.name == name), None)
+        return BleRuntime.default().scan(
             bleak.BleakScanner.find_device_by_filter(
                 lambda _, a: a.local_name == name, timeout))
 
-    def __init__(self, address):
-        self.__event_loop = asyncio.new_event_loop()
+    @staticmethod
+    def max_connecting() -> int:
+        """Connection attempts the default runtime makes at once, further ones wait for their turn."""
+        return BleRuntime.default().max_connecting
+
+    def __init__(self, address, runtime: BleRuntime = None):
+        self.__runtime = runtime or BleRuntime.default()
+        self.__address = getattr(address, 'address', address)
         self.__device = bleak.BleakClient(address, timeout=5.0)
-        self.__lock = threading.Lock()
-        self.__thread = threading.Thread(target=self.__event_loop.run_forever)
-        self.__thread.start()
+        self.__flow = WriteFlow(self.__device)
+        self.__runtime.register(self.__address)
         try:
-            self.__execute(self.__device.connect())
+            self.__runtime.connect(self.__device, self.__address)
         except:
             self.close(False)
             raise
 
+    @property
+    def runtime(self) -> BleRuntime:
+        return self.__runtime
+
     def __execute(self, coroutine):
-        with self.__lock:
-            return asyncio.run_coroutine_threadsafe(coroutine, self.__event_loop).result()
+        return self.__runtime.execute(coroutine, self.__address)
 
     def close(self, disconnect=True):
-        if disconnect:
-            self.__execute(self.__device.disconnect())
-        with self.__lock:
-            self.__event_loop.call_soon_threadsafe(self.__event_loop.stop)
-            self.__thread.join()
-        self.__event_loop.close()
+        try:
+            if disconnect:
+                self.__execute(self.__device.disconnect())
+        finally:
+            self.__runtime.release(self.__address)
 
     def set_callback(self, uuid, cb):
         self.__execute(self.__device.start_notify(uuid, cb))
 
+    def max_write_size(self, uuid) -> int:
+        return self.__flow.mode(uuid).size
+
     def write(self, uuid, data):
-        self.__execute(self.__device.write_gatt_char(uuid, data, True))
+        self.__execute(self.__device.write_gatt_char(uuid, data, self.__flow.response(uuid, len(data))))
+
+
+class AsyncBleakAdapter:
+    """Adapter for :class:`sphero_unsw.async_toy.AsyncToy`, running the client directly on the caller's event loop."""
+
+    @staticmethod
+    async def scan_toys(timeout: float = 5.0):
+        return await bleak.BleakScanner.discover(timeout)
+
+    @staticmethod
+    async def scan_toy(name: str, timeout: float = 5.0):
+        return await bleak.BleakScanner.find_device_by_filter(lambda _, a: a.local_name == name, timeout)
+
+    def __init__(self, address):
+        self.__device = bleak.BleakClient(address, timeout=5.0)
+        self.__flow = WriteFlow(self.__device)
+
+    async def connect(self):
+        await self.__device.connect()
+
+    async def close(self, disconnect=True):
+        if disconnect:
+            await self.__device.disconnect()
+
+    async def set_callback(self, uuid, cb):
+        await self.__device.start_notify(uuid, cb)
+
+    def max_write_size(self, uuid) -> int:
+        return self.__flow.mode(uuid).size
+
+    async def write(self, uuid, data):
+        await self.__device.write_gatt_char(uuid, data, self.__flow.response(uuid, len(data)))
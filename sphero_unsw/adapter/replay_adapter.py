@@ -0,0 +1,232 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+import math
+import struct
+import threading
+import time
+from enum import IntEnum
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional
+
+from sphero_unsw.adapter.tcp_adapter import MockDevice
+
+# Log layout: MAGIC, then a header record with the device name and address, then records of
+# [KIND, UUID ID, TIMESTAMP (microseconds since the first record), SIZE, DATA...]. A UUID is written once in a
+# record of kind UUID, later records refer to it by id.
+MAGIC = b'SPRL\x01'
+_RECORD = struct.Struct('>BBQH')
+
+
+class RecordKinds(IntEnum):
+    HEADER = 0
+    UUID = 1
+    WRITE = 2
+    NOTIFY = 3
+
+
+class LogRecord(NamedTuple):
+    kind: RecordKinds
+    uuid: Optional[str]
+    timestamp: float
+    data: bytes
+
+
+class LogWriter:
+    def __init__(self, file: BinaryIO, name: Optional[str], address: str):
+        self.__file = file
+        self.__lock = threading.Lock()
+        self.__uuids = {}
+        self.__start = time.monotonic()
+        file.write(MAGIC)
+        self.__write(RecordKinds.HEADER, 0, 0, f'{name or ""}\n{address}'.encode('utf_8'))
+
+    def __write(self, kind, uuid_id, timestamp, data):
+        self.__file.write(_RECORD.pack(kind, uuid_id, timestamp, len(data)))
+        self.__file.write(data)
+
+    def record(self, kind: RecordKinds, uuid: str, data):
+        timestamp = int((time.monotonic() - self.__start) * 1e6)
+        with self.__lock:
+            uuid_id = self.__uuids.get(uuid)
+            if uuid_id is None:
+                uuid_id = self.__uuids[uuid] = len(self.__uuids)
+                self.__write(RecordKinds.UUID, uuid_id, timestamp, uuid.encode('ascii'))
+            self.__write(kind, uuid_id, timestamp, bytes(data))
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+
+def read_log(path: str) -> Iterator[LogRecord]:
+    """Iterates over the records of a log written by a recording adapter, resolving UUIDs and converting timestamps
+    to seconds. The header comes first, with ``name\\naddress`` as data."""
+    uuids = {}
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a BLE traffic log')
+        while True:
+            head = f.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                return
+            kind, uuid_id, timestamp, size = _RECORD.unpack(head)
+            data = f.read(size)
+            if kind == RecordKinds.UUID:
+                uuids[uuid_id] = data.decode('ascii')
+                continue
+            yield LogRecord(RecordKinds(kind), uuids.get(uuid_id), timestamp / 1e6, data)
+
+
+def get_recording_adapter(adapter_cls, path: str):
+    """Gets an anonymous ``RecordingAdapter`` wrapping ``adapter_cls`` that logs every write and notification to
+    ``path``, which may contain ``{address}`` when several toys are recorded at once."""
+
+    names = {}
+
+    class RecordingAdapter:
+        @staticmethod
+        def scan_toys(timeout=5.0):
+            toys = adapter_cls.scan_toys(timeout)
+            names.update((toy.address, toy.name) for toy in toys)
+            return toys
+
+        @staticmethod
+        def scan_toy(name: str, timeout: float = 5.0):
+            toy = adapter_cls.scan_toy(name, timeout)
+            if toy is not None:
+                names[toy.address] = toy.name
+            return toy
+
+        def __init__(self, address):
+            self.__adapter = adapter_cls(address)
+            address = getattr(address, 'address', address)
+            file_name = path.format(address=''.join(c if c.isalnum() else '_' for c in address))
+            self.__log = LogWriter(open(file_name, 'wb'), names.get(address), address)
+
+        def __getattr__(self, item):
+            return getattr(self.__adapter, item)
+
+        def close(self, disconnect=True):
+            try:
+                self.__adapter.close(disconnect)
+            finally:
+                self.__log.close()
+
+        def set_callback(self, uuid, cb):
+            def record(char, data):
+                self.__log.record(RecordKinds.NOTIFY, uuid, data)
+                cb(char, data)
+
+            self.__adapter.set_callback(uuid, record)
+
+        def write(self, uuid, data):
+            self.__log.record(RecordKinds.WRITE, uuid, data)
+            self.__adapter.write(uuid, data)
+
+    return RecordingAdapter
+
+
+def get_replay_adapter(path: str, speed: float = 1., write_timeout: float = 5.):
+    """Gets an anonymous ``ReplayAdapter`` feeding the notifications logged in ``path`` back to the toy, ``speed``
+    times as fast as recorded, or as fast as possible with ``math.inf``. Replay starts once the toy registers its
+    callback, and the adapter's ``finished`` event is set when the log is exhausted.
+
+    Recorded writes act as barriers: replay waits, up to ``write_timeout`` seconds, until the toy has written as many
+    bytes as had been written at that point of the recording, so responses never arrive before their commands."""
+
+    records: List[LogRecord] = list(read_log(path))
+    name, address = records[0].data.decode('utf_8').split('\n')
+    device = MockDevice(name, address)
+
+    class ReplayAdapter:
+        @staticmethod
+        def scan_toys(timeout=5.0):
+            return [device]
+
+        @staticmethod
+        def scan_toy(name: str, timeout: float = 5.0):
+            return device if device.name == name else None
+
+        def __init__(self, address):
+            self.address = address
+            self.writes = self.notifications = self.bytes_in = 0
+            self.finished = threading.Event()
+            self.__callbacks = {}
+            self.__cond = threading.Condition()
+            self.__closed = False
+            self.__thread = None
+
+        def close(self, disconnect=True):
+            with self.__cond:
+                self.__closed = True
+                self.__cond.notify_all()
+            if self.__thread is not None:
+                self.__thread.join()
+
+        def set_callback(self, uuid, cb):
+            self.__callbacks[uuid] = cb
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__replay, daemon=True)
+                self.__thread.start()
+
+        def write(self, uuid, data):
+            with self.__cond:
+                self.writes += 1
+                self.bytes_in += len(data)
+                self.__cond.notify_all()
+
+        def __replay(self):
+            start = time.monotonic()
+            written = 0
+            for record in records[1:]:
+                if self.__closed:
+                    break
+                if speed != math.inf:
+                    delay = start + record.timestamp / speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                if record.kind == RecordKinds.WRITE:
+                    written += len(record.data)
+                    with self.__cond:
+                        self.__cond.wait_for(lambda: self.bytes_in >= written or self.__closed, write_timeout)
+                    start = max(start, time.monotonic() - record.timestamp / speed)
+                    continue
+                cb = self.__callbacks.get(record.uuid)
+                if cb is not None:
+                    cb(record.uuid, bytearray(record.data))
+                    self.notifications += 1
+            self.finished.set()
+
+    return ReplayAdapter
@@ -0,0 +1,272 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+import heapq
+import itertools
+import math
+import random
+import struct
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Tuple
+
+from sphero_unsw.adapter.tcp_adapter import MockDevice
+from sphero_unsw.controls.v2 import Packet, StreamingControl
+
+
+# characteristic commands are written to, writes to others such as the handshake are not parsed
+_API_UUID = '00010002-574f-4f20-5370-6865726f2121'
+
+
+class BleTiming(NamedTuple):
+    """Timing model of a simulated BLE link and robot, in seconds."""
+
+    write_latency: float = 0.  # time each write blocks the caller, e.g. a GATT round trip
+    bytes_per_second: float = math.inf  # throughput of the link
+    response_latency: float = 0.  # delay between a command being processed and its response
+    process_time: float = 0.  # time the robot spends on each command, commands are processed one at a time
+    jitter: float = 0.  # maximum random delay added to every response and notification
+    max_pending: int = 0  # commands the robot queues before answering busy, 0 for no limit
+    mtu: int = 23
+
+
+INSTANT = BleTiming()
+# rough figures of a BOLT connected from a laptop
+TYPICAL = BleTiming(write_latency=.015, bytes_per_second=8000., response_latency=.02, process_time=.004, jitter=.01,
+                    max_pending=8, mtu=185)
+
+_DEFAULT_RESPONSES = {
+    (16, 1): bytes([2, 1]),  # ApiAndShell.get_api_protocol_version
+    (17, 0): struct.pack('>3H', 1, 2, 3),  # SystemInfo.get_main_app_version
+    (19, 3): struct.pack('>H', 410),  # Power.get_battery_voltage
+    (19, 4): bytes([1]),  # Power.get_battery_state
+    (19, 16): bytes([87]),  # Power.get_battery_percentage
+    (19, 23): bytes([1]),  # Power.get_battery_voltage_state
+}
+_STREAMING_SERVICES = list(StreamingControl._StreamingControl__streaming_services.values())
+
+
+class _Streaming:
+    def __init__(self):
+        self.interval = 0
+        self.count = 0
+        self.mask = 0
+        self.extended_mask = 0
+        self.slots: Dict[int, Dict[int, list]] = {}
+        self.periods: Dict[int, int] = {}
+        self.generation = itertools.count()
+        self.active: Dict[object, int] = {}
+
+
+def get_sim_adapter(names: Iterable[str] = ('BP-0001',), timing: BleTiming = INSTANT,
+                    responses: Dict[Tuple[int, int], bytes] = None, seed=None):
+    """Gets an anonymous ``SimAdapter`` simulating protocol v2 robots with the given names, so that toys, controls and
+    :class:`sphero_unsw.sphero_edu.SpheroEduAPI` can run without hardware.
+
+    Commands are decoded and answered, with the data in ``responses`` for getters, keyed by ``(did, cid)``, and empty
+    data otherwise. Sensor streaming, both by sensor mask and by streaming services, produces notifications at the
+    interval set by the toy. Latencies, throughput and the robot's capacity follow ``timing``."""
+
+    devices = [MockDevice(name, f'SIM-{i:04d}') for i, name in enumerate(names)]
+    responses = {**_DEFAULT_RESPONSES, **(responses or {})}
+    rng = random.Random(seed)
+
+    class SimAdapter:
+        @staticmethod
+        def scan_toys(timeout=5.0):
+            return list(devices)
+
+        @staticmethod
+        def scan_toy(name: str, timeout: float = 5.0):
+            return next((d for d in devices if d.name == name), None)
+
+        def __init__(self, address):
+            self.address = address
+            self.timing = timing
+            self.writes = self.packets = self.notifications = self.bytes_in = self.bytes_out = 0
+            self.__callbacks = {}
+            self.__collector = Packet.Collector(self.__on_packet)
+            self.__streaming = _Streaming()
+            self.__busy_until = 0.
+            self.__pending = 0
+            self.__started = time.monotonic()
+            self.__events = []
+            self.__sequence = itertools.count()
+            self.__cond = threading.Condition()
+            self.__closed = False
+            self.__thread = threading.Thread(target=self.__run, daemon=True)
+            self.__thread.start()
+
+        def close(self, disconnect=True):
+            with self.__cond:
+                self.__closed = True
+                self.__cond.notify()
+            self.__thread.join()
+
+        def set_callback(self, uuid, cb):
+            self.__callbacks[uuid] = cb
+
+        def max_write_size(self, uuid) -> int:
+            return timing.mtu - 3
+
+        def write(self, uuid, data):
+            delay = timing.write_latency + len(data) / timing.bytes_per_second
+            if delay > 0:
+                time.sleep(delay)
+            self.writes += 1
+            self.bytes_in += len(data)
+            if uuid == _API_UUID:
+                self.__collector.add(bytearray(data))
+
+        def __schedule(self, at, fn, *args):
+            with self.__cond:
+                heapq.heappush(self.__events, (at, next(self.__sequence), fn, args))
+                self.__cond.notify()
+
+        def __run(self):
+            with self.__cond:
+                while not self.__closed:
+                    if not self.__events:
+                        self.__cond.wait()
+                        continue
+                    delay = self.__events[0][0] - time.monotonic()
+                    if delay > 0:
+                        self.__cond.wait(delay)
+                        continue
+                    _, _, fn, args = heapq.heappop(self.__events)
+                    self.__cond.release()
+                    try:
+                        fn(*args)
+                    finally:
+                        self.__cond.acquire()
+
+        def __notify(self, packet: Packet):
+            payload = packet.build()
+            self.bytes_out += len(payload)
+            for uuid, cb in list(self.__callbacks.items()):
+                cb(uuid, payload)
+
+        def __jitter(self):
+            return rng.uniform(0, timing.jitter) if timing.jitter else 0.
+
+        def __on_packet(self, packet: Packet):
+            self.packets += 1
+            now = time.monotonic()
+            flags = packet.flags
+            wants_response = flags & Packet.Flags.requests_response
+            wants_error = wants_response or flags & Packet.Flags.requests_only_error_response
+            if timing.max_pending and self.__pending >= timing.max_pending:
+                if wants_error:
+                    self.__schedule(now + timing.response_latency + self.__jitter(), self.__respond, packet,
+                                    Packet.Error.busy, b'')
+                return
+            start = max(now, self.__busy_until)
+            self.__busy_until = start + timing.process_time
+            self.__pending += 1
+            self.__schedule(self.__busy_until, self.__process, packet)
+
+        def __process(self, packet: Packet):
+            self.__pending -= 1
+            err, data = self.__execute(packet)
+            if packet.flags & Packet.Flags.requests_response or \
+                    (err != Packet.Error.success and packet.flags & Packet.Flags.requests_only_error_response):
+                self.__schedule(time.monotonic() + timing.response_latency + self.__jitter(), self.__respond, packet,
+                                err, data)
+
+        def __respond(self, request: Packet, err, data):
+            flags = Packet.Flags.is_response
+            if request.tid is not None:
+                flags |= Packet.Flags.has_target_id | Packet.Flags.has_source_id
+            self.__notify(Packet(flags, request.did, request.cid, request.seq, request.sid, request.tid,
+                                 bytearray(data), err))
+
+        def __execute(self, packet: Packet):
+            streaming = self.__streaming
+            key = packet.did, packet.cid
+            data = bytes(packet.data)
+            if key == (24, 0):  # set_sensor_streaming_mask
+                streaming.interval, streaming.count, streaming.mask = struct.unpack('>HBI', data)
+                self.__restart(None, streaming.interval)
+            elif key == (24, 1):  # get_sensor_streaming_mask
+                return Packet.Error.success, struct.pack('>HBI', streaming.interval, streaming.count, streaming.mask)
+            elif key == (24, 12):  # set_extended_sensor_streaming_mask
+                streaming.extended_mask, = struct.unpack('>I', data)
+            elif key == (24, 13):  # get_extended_sensor_streaming_mask
+                return Packet.Error.success, struct.pack('>I', streaming.extended_mask)
+            elif key == (24, 57):  # configure_streaming_service
+                services = [(data[i] << 8 | data[i + 1], data[i + 2]) for i in range(1, len(data) - 2, 3)]
+                streaming.slots.setdefault(packet.tid, {})[data[0]] = services
+            elif key == (24, 58):  # start_streaming_service
+                self.__restart(packet.tid, data[0] << 8 | data[1])
+            elif key == (24, 59):  # stop_streaming_service
+                self.__restart(packet.tid, 0)
+            elif key == (24, 60):  # clear_streaming_service
+                self.__restart(packet.tid, 0)
+                streaming.slots.pop(packet.tid, None)
+            return Packet.Error.success, responses.get(key, b'')
+
+        def __restart(self, target, interval):
+            generation = self.__streaming.active[target] = next(self.__streaming.generation)
+            if interval > 0:
+                self.__schedule(time.monotonic() + interval / 1000, self.__stream, target, interval, generation)
+
+        def __stream(self, target, interval, generation):
+            streaming = self.__streaming
+            if streaming.active.get(target) != generation:
+                return
+            t = time.monotonic() - self.__started
+            if target is None:
+                count = bin(streaming.mask).count('1') + bin(streaming.extended_mask).count('1')
+                if count:
+                    values = [math.sin(t + i) for i in range(count)]
+                    self.__notify(Packet(Packet.Flags.is_activity, 24, 2, 0xff, None, None,
+                                         bytearray(struct.pack('>%df' % count, *values))))
+                    self.notifications += 1
+            else:
+                for token, services in streaming.slots.get(target, {}).items():
+                    data = bytearray([token])
+                    for index, size in services:
+                        attributes = len(_STREAMING_SERVICES[index].attributes)
+                        bits = 8 << size
+                        value = int((math.sin(t + index) + 1) / 2 * ((1 << bits) - 1))
+                        data.extend(value.to_bytes(bits // 8, 'big') * attributes)
+                    self.__notify(Packet(Packet.Flags.is_activity | Packet.Flags.has_source_id, 24, 61, 0xff, None,
+                                         target, data))
+                    self.notifications += 1
+            self.__schedule(time.monotonic() + interval / 1000 + self.__jitter(), self.__stream, target, interval,
+                            generation)
+
+    return SimAdapter
+
@@ -36,6 +36,7 @@
 import socket
 import struct
 import threading
+import traceback
 from concurrent import futures
 from typing import NamedTuple
 
@@ -49,17 +50,237 @@ class MockDevice(NamedTuple):
 
 
 def recvall(s, size):
-    data = bytes()
-    while len(data) < size:
-        n = s.recv(size - len(data))
+    data = bytearray(size)
+    with memoryview(data) as view:
+        received = 0
+        while received < size:
+            n = s.recv_into(view[received:])
+            if not n:
+                raise EOFError
+            received += n
+    return bytes(data)
+
+
+_U16 = struct.Struct('>H')
+_DROPPED = struct.Struct('>HI')
+
+
+class FrameReader:
+    """Reads the frames sent by the TCP server into a reusable buffer, parsing every whole frame received by each
+    ``recv_into``. Iterating yields ``(op, key, message, data)``: OK and ERROR answers have their sequence id as
+    ``key`` and ERROR its message, each notification of an ON_DATA batch has the handle of its characteristic as
+    ``key`` and its ``data``, and DROPPED has the handle as ``key`` and the number of packets the server dropped as
+    ``data``. Messages and data are memoryview slices of the buffer, only valid until the next frame is read."""
+
+    def __init__(self, sock: socket.socket, size: int = 0x10000):
+        self.__socket = sock
+        self.__buffer = bytearray(size)
+        self.__view = memoryview(self.__buffer)
+        self.__start = self.__end = 0
+
+    def __fill(self):
+        start, end = self.__start, self.__end
+        if start == end:
+            start = end = 0
+        elif end == len(self.__buffer):
+            if start == 0:
+                buffer = bytearray(len(self.__buffer) * 2)
+                buffer[:end] = self.__view[:end]
+                self.__buffer, self.__view = buffer, memoryview(buffer)
+            else:
+                self.__view[:end - start] = self.__view[start:end]
+                start, end = 0, end - start
+        n = self.__socket.recv_into(self.__view[end:])
         if not n:
             raise EOFError
-        data += n
-    return data
+        self.__start, self.__end = start, end + n
+
+    def __parse(self, pos: int, end: int):
+        """Parses the frame at ``pos``, returning what it yields with the position following it, or ``None`` if the
+        frame is incomplete."""
+        buffer, view = self.__buffer, self.__view
+        op = buffer[pos]
+        if op == ResponseOp.OK[0]:
+            if end - pos < 3:
+                return None
+            return [(ResponseOp.OK, _U16.unpack_from(buffer, pos + 1)[0], None, None)], pos + 3
+        if op == ResponseOp.DROPPED[0]:
+            if end - pos < 7:
+                return None
+            handle, count = _DROPPED.unpack_from(buffer, pos + 1)
+            return [(ResponseOp.DROPPED, handle, None, count)], pos + 7
+        if end - pos < 3:
+            return None
+        size = _U16.unpack_from(buffer, pos + 1)[0]
+        if op == ResponseOp.ERROR[0]:
+            if end - pos < 5 + size:
+                return None
+            seq = _U16.unpack_from(buffer, pos + 3 + size)[0]
+            return [(ResponseOp.ERROR, seq, view[pos + 3:pos + 3 + size], None)], pos + 5 + size
+        if op == ResponseOp.ON_DATA[0]:
+            frame_end = pos + 3 + size
+            if end < frame_end:
+                return None
+            frames = []
+            pos += 3
+            while pos < frame_end:
+                handle, data_end = _U16.unpack_from(buffer, pos)[0], pos + 3 + buffer[pos + 2]
+                frames.append((ResponseOp.ON_DATA, handle, None, view[pos + 3:data_end]))
+                pos = data_end
+            return frames, frame_end
+        raise SystemError(f'Unexpected response op code {bytes([op])}')
+
+    def __iter__(self):
+        while True:
+            self.__fill()
+            pos, end = self.__start, self.__end
+            while pos < end:
+                parsed = self.__parse(pos, end)
+                if parsed is None:
+                    break
+                frames, pos = parsed
+                self.__start = pos
+                yield from frames
+
+
+class TCPRequestError(Exception):
+    """Raised when the TCP server fails to carry out a request, naming the request that failed."""
+
+    def __init__(self, message: str, op: RequestOp, channel: int, seq: int):
+        super().__init__(f'{op.name} #{seq} on channel {channel} failed: {message}')
+        self.op = op
+        self.channel = channel
+        self.seq = seq
+
+
+class TCPSession:
+    """Connection to a TCP server shared by all toys bridged through it. Each toy is a channel of the session, and
+    the server keeps one BLE client per channel.
+
+    Notifications of a characteristic are sent with the short handle given to it by :meth:`open_handle`, and the
+    server batches them in ON_DATA frames. Streaming notifications the server drops while the client is slow to read
+    are counted in DROPPED frames. Requests are pipelined: :meth:`submit` returns as soon as the request is sent, with
+    a future completed by the server's answer. Sequence ids are 16 bits wide, so up to 65536 requests may be
+    outstanding at once."""
+
+    def __init__(self, host: str, port: int):
+        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__socket.connect((host, port))
+        self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.__send_lock = threading.Lock()
+        self.__sequence = 0
+        self.__sequence_wait = {}
+        self.__channels = {}
+        self.__next_channel = 0
+        self.__handles = {}
+        self.__next_handle = 0
+        self.__lost = False
+        self.__thread = threading.Thread(target=self.__recv, daemon=True)
+        self.__thread.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.__thread.is_alive()
+
+    def open_channel(self, adapter) -> int:
+        with self.__send_lock:
+            if len(self.__channels) > 0xffff:
+                raise ConnectionError('No channel left in TCP session')
+            while self.__next_channel in self.__channels:
+                self.__next_channel = (self.__next_channel + 1) % 0x10000
+            channel = self.__next_channel
+            self.__channels[channel] = adapter
+            self.__next_channel = (self.__next_channel + 1) % 0x10000
+            return channel
+
+    def close_channel(self, channel: int):
+        with self.__send_lock:
+            adapter = self.__channels.pop(channel, None)
+            for handle in [h for h, (a, _) in self.__handles.items() if a is adapter]:
+                del self.__handles[handle]
+
+    def open_handle(self, adapter, uuid: str) -> int:
+        """Gives a characteristic of the toy of ``adapter`` the handle its notifications are sent with."""
+        with self.__send_lock:
+            if len(self.__handles) > 0xffff:
+                raise ConnectionError('No handle left in TCP session')
+            while self.__next_handle in self.__handles:
+                self.__next_handle = (self.__next_handle + 1) % 0x10000
+            handle = self.__next_handle
+            self.__handles[handle] = adapter, uuid
+            self.__next_handle = (self.__next_handle + 1) % 0x10000
+            return handle
+
+    def __recv(self):
+        try:
+            for code, key, message, data in FrameReader(self.__socket):
+                if code == ResponseOp.ON_DATA:
+                    adapter, uuid = self.__handles.get(key, (None, None))
+                    if adapter is not None:
+                        try:
+                            adapter.on_data(uuid, data)
+                        except Exception:
+                            traceback.print_exc()
+                elif code == ResponseOp.DROPPED:
+                    adapter, uuid = self.__handles.get(key, (None, None))
+                    if adapter is not None:
+                        adapter.on_dropped(uuid, data)
+                elif code == ResponseOp.OK:
+                    self.__sequence_wait.pop(key)[0].set_result(None)
+                else:
+                    f, cmd, channel = self.__sequence_wait.pop(key)
+                    f.set_exception(TCPRequestError(str(message, 'utf_8'), cmd, channel, key))
+        except:
+            pass
+        with self.__send_lock:
+            self.__lost = True
+            waiting = list(self.__sequence_wait.values())
+            self.__sequence_wait.clear()
+        for f, _, _ in waiting:
+            f.set_exception(ConnectionError('Connection is lost'))
+
+    def submit(self, cmd: RequestOp, channel: int, payload) -> futures.Future:
+        """Sends a request without waiting for the server to answer it."""
+        with self.__send_lock:
+            if self.__lost:
+                raise ConnectionError('Connection is lost')
+            if len(self.__sequence_wait) > 0xffff:
+                raise ConnectionError('Too many outstanding requests in TCP session')
+            while self.__sequence in self.__sequence_wait:
+                self.__sequence = (self.__sequence + 1) % 0x10000
+            seq = self.__sequence
+            self.__sequence = (self.__sequence + 1) % 0x10000
+            f = futures.Future()
+            self.__sequence_wait[seq] = f, cmd, channel
+            try:
+                self.__socket.sendall(cmd + to_bytes(seq, 2) + to_bytes(channel, 2) + payload)
+            except OSError:
+                del self.__sequence_wait[seq]
+                raise
+        return f
+
+    def request(self, cmd: RequestOp, channel: int, payload):
+        self.submit(cmd, channel, payload).result()
+
+    def close(self):
+        try:
+            self.__socket.sendall(RequestOp.END)
+            self.__socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.__socket.close()
+        self.__thread.join()
 
 
-def get_tcp_adapter(host: str, port: int = 50004):
-    """Gets an anonymous ``TCPAdapter`` with the given address and port."""
+def get_tcp_adapter(host: str, port: int = 50004, window: int = 16):
+    """Gets an anonymous ``TCPAdapter`` with the given address and port. All toys using it share one connection.
+
+    Each toy may have up to ``window`` writes sent but not yet acknowledged by the server, so writes do not wait for
+    a network round trip. A write the server fails to carry out is reported on the future returned by :meth:`write`,
+    which toys use to fail the commands it carried, and raised by :meth:`flush`.
+
+    When the toy streams sensor data faster than the client reads it, the server drops the oldest streaming packets,
+    never responses, and ``dropped`` counts the packets dropped for the toy."""
 
     class TCPAdapter:
         @staticmethod
@@ -115,59 +336,52 @@ def get_tcp_adapter(host: str, port: int = 50004):
                 s.close()
 
         def __init__(self, address):
-            self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.__socket.connect((host, port))
-            address = address.encode('ascii')
-
-            self.__sequence = 0
-            self.__sequence_wait = {}
-
+            self.__session = acquire_session()
+            self.__channel = self.__session.open_channel(self)
             self.__callbacks = {}
-            self.__thread = threading.Thread(target=self.__recv)
-            self.__thread.start()
+            self.__window = threading.BoundedSemaphore(window)
+            self.__pending = set()
+            self.__error = None
+            self.dropped = 0
+            address = address.encode('ascii')
             try:
-                self.__send(RequestOp.INIT, to_bytes(
-                    len(address), 2) + address)
+                self.__session.request(RequestOp.INIT, self.__channel, to_bytes(len(address), 2) + address)
             except:
-                self.close()
+                self.__session.close_channel(self.__channel)
+                release_session()
                 raise
 
-        def __recv(self):
-            while True:
-                try:
-                    code = recvall(self.__socket, 1)
-                except:
-                    break
-                if code == ResponseOp.OK:
-                    self.__sequence_wait.pop(
-                        recvall(self.__socket, 1)[0]).set_result(None)
-                    continue
-                size = to_int(recvall(self.__socket, 2))
-                data = recvall(self.__socket, size)
-                if code == ResponseOp.ON_DATA:
-                    uuid = data.decode('ascii').lower()
-                    size = recvall(self.__socket, 1)[0]
-                    data = recvall(self.__socket, size)
-                    for f in self.__callbacks.get(uuid, []):
-                        f(uuid, data)
-                elif code == ResponseOp.ERROR:
-                    err = Exception(data.decode('utf_8'))
-                    self.__sequence_wait.pop(recvall(self.__socket, 1)[
-                                             0]).set_exception(err)
-
-        def __send(self, cmd, payload):
-            if not self.__thread.is_alive():
-                raise ConnectionError('Connection is lost')
-            seq = self.__sequence
-            self.__sequence = (self.__sequence + 1) % 0x100
-            f = self.__sequence_wait[seq] = futures.Future()
-            self.__socket.sendall(cmd + bytes([seq]) + payload)
-            f.result()
+        def on_data(self, uuid, data):
+            for f in self.__callbacks.get(uuid, []):
+                f(uuid, data)
+
+        def on_dropped(self, uuid, count):
+            self.dropped += count
+
+        def __check_error(self):
+            error, self.__error = self.__error, None
+            if error is not None:
+                raise error
+
+        def __on_written(self, f):
+            self.__pending.discard(f)
+            self.__window.release()
+            if f.exception() is not None and self.__error is None:
+                self.__error = f.exception()
+
+        def flush(self):
+            """Waits until the server has acknowledged all writes, raising the first one that failed."""
+            futures.wait(list(self.__pending))
+            self.__check_error()
 
         def close(self):
-            self.__socket.sendall(RequestOp.END)
-            self.__socket.close()
-            self.__thread.join()
+            try:
+                self.__session.request(RequestOp.CLOSE, self.__channel, to_bytes(0, 2))
+            except ConnectionError:
+                pass
+            finally:
+                self.__session.close_channel(self.__channel)
+                release_session()
 
         def set_callback(self, uuid, cb):
             if uuid in self.__callbacks:
@@ -175,12 +389,44 @@ def get_tcp_adapter(host: str, port: int = 50004):
             else:
                 self.__callbacks[uuid] = {cb}
                 buf = uuid.encode('ascii')
-                self.__send(RequestOp.SET_CALLBACK,
-                            to_bytes(len(buf), 2) + buf)
+                handle = self.__session.open_handle(self, uuid)
+                self.__session.request(RequestOp.SET_CALLBACK, self.__channel,
+                                       to_bytes(len(buf), 2) + buf + to_bytes(handle, 2))
 
-        def write(self, uuid, data):
+        def write(self, uuid, data) -> futures.Future:
+            """Sends the write without waiting for the server, returning the future of its acknowledgement. A failed
+            write is only raised by that future and by :meth:`flush`."""
             uuid = uuid.encode('ascii')
-            self.__send(RequestOp.WRITE, to_bytes(len(uuid), 2) +
-                        uuid + to_bytes(len(data), 2) + data)
+            self.__window.acquire()
+            try:
+                f = self.__session.submit(RequestOp.WRITE, self.__channel, to_bytes(len(uuid), 2) +
+                                          uuid + to_bytes(len(data), 2) + data)
+            except:
+                self.__window.release()
+                raise
+            self.__pending.add(f)
+            f.add_done_callback(self.__on_written)
+            return f
+
+    session = None
+    session_users = 0
+    session_lock = threading.Lock()
+
+    def acquire_session() -> TCPSession:
+        nonlocal session, session_users
+        with session_lock:
+            if session is None or not session.alive:
+                session = TCPSession(host, port)
+                session_users = 0
+            session_users += 1
+            return session
+
+    def release_session():
+        nonlocal session, session_users
+        with session_lock:
+            session_users -= 1
+            if session_users == 0 and session is not None:
+                session.close()
+                session = None
 
     return TCPAdapter
@@ -42,10 +42,12 @@ class RequestOp(bytes, Enum):
     SET_CALLBACK = b'\x02'
     WRITE = b'\x03'
     FIND = b'\x04'
+    CLOSE = b'\x05'
     END = b'\xff'
 
 
 class ResponseOp(bytes, Enum):
     OK = b'\x00'
     ON_DATA = b'\x01'
+    DROPPED = b'\x02'
     ERROR = b'\xff'
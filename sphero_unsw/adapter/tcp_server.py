@@ -36,27 +36,321 @@
 import asyncio
 import struct
 import sys
-from typing import Optional
+import time
+from collections import defaultdict, deque
+from functools import partial
+from typing import Dict, NamedTuple, List, Callable, Optional
 
 import bleak
 
 from sphero_unsw.adapter.tcp_consts import RequestOp, ResponseOp
+from sphero_unsw.controls import PacketDecodingException
+from sphero_unsw.controls.v1 import Packet as PacketV1
+from sphero_unsw.controls.v2 import Packet as PacketV2
 from sphero_unsw.helper import to_bytes, to_int
 
 
+class SeenDevice(NamedTuple):
+    name: Optional[str]
+    address: str
+    last_seen: float
+
+
+class SharedScanner:
+    """One scanner shared by all connections of the server, remembering the devices advertised during the last
+    ``ttl`` seconds. It starts with the first SCAN or FIND and runs until no SCAN or FIND has come for
+    ``idle_timeout`` seconds.
+
+    SCAN and FIND are answered from the devices it has seen instead of starting scans of their own, so requests of
+    different clients, or FIND requests for different names, arriving at the same time share the same scan."""
+
+    def __init__(self, ttl: float = 30., idle_timeout: float = 60.):
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self.__scanner = None
+        self.__started_at = None
+        self.__starting = None
+        self.__seen = {}
+        self.__changed = None
+        self.__users = 0
+        self.__idle_timer = None
+
+    def __on_detection(self, device, advertisement):
+        self.__seen[device.address] = SeenDevice(advertisement.local_name or device.name, device.address,
+                                                 time.monotonic())
+        changed, self.__changed = self.__changed, asyncio.Event()
+        changed.set()
+
+    async def __start(self):
+        if self.__scanner is not None:
+            return
+        if self.__starting is None:
+            self.__starting = asyncio.ensure_future(self.__start_scanner())
+        try:
+            await asyncio.shield(self.__starting)
+        finally:
+            if self.__starting is not None and self.__starting.done():
+                self.__starting = None
+
+    async def __start_scanner(self):
+        self.__changed = asyncio.Event()
+        scanner = bleak.BleakScanner(self.__on_detection)
+        await scanner.start()
+        self.__scanner = scanner
+        self.__started_at = time.monotonic()
+
+    async def stop(self):
+        scanner, self.__scanner = self.__scanner, None
+        if self.__idle_timer is not None:
+            self.__idle_timer.cancel()
+            self.__idle_timer = None
+        self.__seen.clear()
+        if scanner is not None:
+            await scanner.stop()
+
+    def __stop_if_idle(self):
+        self.__idle_timer = None
+        if self.__users == 0:
+            asyncio.ensure_future(self.stop())
+
+    def devices(self) -> List[SeenDevice]:
+        """Devices advertised during the last ``ttl`` seconds."""
+        expiry = time.monotonic() - self.ttl
+        for address in [a for a, seen in self.__seen.items() if seen.last_seen < expiry]:
+            del self.__seen[address]
+        return list(self.__seen.values())
+
+    async def wait(self, found: Callable[[List[SeenDevice]], bool] = None, timeout: float = 5.0) -> List[SeenDevice]:
+        """Waits until ``found`` accepts the devices seen, or without ``found``, until the scanner has been running for
+        ``timeout`` seconds, then returns the devices seen."""
+        self.__users += 1
+        try:
+            deadline = time.monotonic() + timeout
+            await self.__start()
+            if found is None:
+                deadline = min(deadline, self.__started_at + timeout)
+            while True:
+                devices = self.devices()
+                remaining = deadline - time.monotonic()
+                if (found is not None and found(devices)) or remaining <= 0:
+                    return devices
+                try:
+                    await asyncio.wait_for(self.__changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.__users -= 1
+            if self.__idle_timer is not None:
+                self.__idle_timer.cancel()
+            self.__idle_timer = asyncio.get_running_loop().call_later(self.idle_timeout, self.__stop_if_idle)
+
+    async def find(self, name: str, timeout: float = 5.0) -> Optional[SeenDevice]:
+        devices = await self.wait(lambda seen: any(d.name == name for d in seen), timeout)
+        return next((d for d in devices if d.name == name), None)
+
+
+shared_scanner = SharedScanner()
+
+
+async def disconnect(adapter: bleak.BleakClient):
+    if adapter.is_connected:
+        await adapter.disconnect()
+
+
+# notifications sent periodically while sensors stream, which may be dropped when a client falls behind:
+# (did, cid) of protocol v2 packets and id codes of v1 async packets
+STREAMING_V2 = {(24, 2), (24, 61)}
+STREAMING_V1 = {3}
+
+
+def packet_end(buffer: bytearray, start: int) -> Optional[int]:
+    """End of the v1 or v2 packet starting at ``start`` of the buffer, or ``None`` if it is not complete yet. Data
+    that does not start a packet is taken up to the end of the buffer."""
+    first = buffer[start]
+    if first == PacketV2.Encoding.start:
+        end = buffer.find(PacketV2.Encoding.end, start + 1)
+        return None if end == -1 else end + 1
+    if first == PacketV1.SOP:
+        if len(buffer) - start < 5:
+            return None
+        if buffer[start + 1] == PacketV1.SOP:
+            end = start + 5 + buffer[start + 4]
+        elif buffer[start + 1] == PacketV1.ASYNC:
+            end = start + 5 + (buffer[start + 3] << 8 | buffer[start + 4])
+        else:
+            return len(buffer)
+        return end if end <= len(buffer) else None
+    return len(buffer)
+
+
+def is_streaming(packet: bytes) -> bool:
+    """Whether the packet is a sensor streaming notification, rather than a response or another notification."""
+    if packet[0] == PacketV1.SOP:
+        return len(packet) > 2 and packet[1] == PacketV1.ASYNC and packet[2] in STREAMING_V1
+    try:
+        parsed = PacketV2.parse_response(packet)
+    except (PacketDecodingException, ValueError):
+        return False
+    return not parsed.flags & PacketV2.Flags.is_response and (parsed.did, parsed.cid) in STREAMING_V2
+
+
+class NotificationBatcher:
+    """Sends the notifications of all toys of a connection in batches, one ON_DATA frame per flush. A flush happens
+    ``interval`` seconds after the first notification of a batch, or as soon as ``size`` bytes are waiting.
+
+    Notifications are queued as whole packets, reassembled per characteristic. Only one flush is written at a time.
+    While the client is slow to read, packets wait, and when more than ``max_backlog`` bytes of them are waiting, the
+    oldest sensor streaming packets are dropped. Responses and other notifications are never dropped, so the client
+    stays in sync with the toys. The number of packets dropped is sent to the client in a DROPPED frame of the
+    characteristic before the following batch."""
+
+    MAX_FRAME = 0xffff
+    MAX_DATA = 0xff
+
+    def __init__(self, writer: asyncio.StreamWriter, interval: float = .002, size: int = 1400,
+                 max_backlog: int = 0x40000):
+        self.__writer = writer
+        self.__interval = interval
+        self.__size = size
+        self.__max_backlog = max_backlog
+        self.__partial = defaultdict(bytearray)
+        self.__entries = deque()
+        self.__waiting = 0
+        self.__dropped = defaultdict(int)
+        self.__ready = asyncio.Event()
+        self.__timer = None
+        self.__task = asyncio.ensure_future(self.__run())
+        self.dropped = 0
+
+    def add(self, handle: bytes, data):
+        buffer = self.__partial[handle]
+        buffer += data
+        start = 0
+        while start < len(buffer):
+            end = packet_end(buffer, start)
+            if end is None:
+                break
+            self.__queue(handle, bytes(buffer[start:end]))
+            start = end
+        del buffer[:start]
+        if self.__waiting > self.__max_backlog:
+            self.__drop_streaming()
+        if self.__waiting >= self.__size:
+            self.__flush_soon()
+        elif self.__waiting and self.__timer is None:
+            self.__timer = asyncio.get_running_loop().call_later(self.__interval, self.__flush_soon)
+
+    def __queue(self, handle: bytes, packet: bytes):
+        if len(packet) <= self.MAX_DATA:
+            self.__entries.append((handle, handle + bytes([len(packet)]) + packet, packet))
+            self.__waiting += len(packet) + 3
+            return
+        # longer packets are sent in pieces, and never dropped
+        for i in range(0, len(packet), self.MAX_DATA):
+            chunk = packet[i:i + self.MAX_DATA]
+            self.__entries.append((handle, handle + bytes([len(chunk)]) + chunk, None))
+            self.__waiting += len(chunk) + 3
+
+    def __drop_streaming(self):
+        """Drops the oldest streaming packets until a quarter of the backlog is free, so the backlog is not scanned
+        again for every packet added."""
+        target = self.__max_backlog * 3 // 4
+        kept = deque()
+        for handle, entry, packet in self.__entries:
+            if self.__waiting > target and packet is not None and is_streaming(packet):
+                self.__waiting -= len(entry)
+                self.__dropped[handle] += 1
+                self.dropped += 1
+            else:
+                kept.append((handle, entry, packet))
+        self.__entries = kept
+
+    def __flush_soon(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        self.__ready.set()
+
+    async def __run(self):
+        while True:
+            await self.__ready.wait()
+            self.__ready.clear()
+            if self.__writer.is_closing():
+                self.__entries.clear()
+                self.__waiting = 0
+                continue
+            dropped, self.__dropped = self.__dropped, defaultdict(int)
+            for handle, count in dropped.items():
+                self.__writer.write(ResponseOp.DROPPED + handle + to_bytes(count, 4))
+            while self.__entries:
+                frame = bytearray(ResponseOp.ON_DATA + b'\x00\x00')
+                while self.__entries and len(frame) + len(self.__entries[0][1]) <= self.MAX_FRAME + 3:
+                    _, entry, _ = self.__entries.popleft()
+                    self.__waiting -= len(entry)
+                    frame += entry
+                frame[1:3] = to_bytes(len(frame) - 3, 2)
+                self.__writer.write(frame)
+            try:
+                await self.__writer.drain()
+            except ConnectionError:
+                pass
+
+    async def close(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+        self.__task.cancel()
+        try:
+            await self.__task
+        except asyncio.CancelledError:
+            pass
+
+
 async def process_connection(reader: asyncio.streams.StreamReader, writer: asyncio.streams.StreamWriter):
     peer = writer.get_extra_info('peername')
+    batcher = NotificationBatcher(writer)
 
-    def callback(char, d):
-        if writer.is_closing():
-            return
-        char = char.uuid.encode('ascii')
-        writer.write(ResponseOp.ON_DATA + to_bytes(len(char),
-                     2) + char + to_bytes(len(d), 1) + d)
-        asyncio.ensure_future(writer.drain())
+    def callback(handle, _, d):
+        batcher.add(handle, d)
 
     print('Incoming connection from %s:%d' % peer)
-    adapter: Optional[bleak.BleakClient] = None
+    adapters: Dict[int, bleak.BleakClient] = {}
+    locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+    tasks = set()
+
+    def adapter_of(channel) -> bleak.BleakClient:
+        if channel not in adapters:
+            raise ValueError(f'Channel {channel} is not open')
+        return adapters[channel]
+
+    async def process_request(cmd, seq, channel, data, payload, handle):
+        async with locks[channel]:
+            try:
+                if cmd == RequestOp.WRITE:
+                    await adapter_of(channel).write_gatt_char(data, payload, True)
+                elif cmd == RequestOp.INIT:
+                    if channel in adapters:
+                        raise ValueError(f'Channel {channel} is already open')
+                    adapter = bleak.BleakClient(data, timeout=5.0)
+                    await adapter.connect()
+                    adapters[channel] = adapter
+                elif cmd == RequestOp.SET_CALLBACK:
+                    await adapter_of(channel).start_notify(data, partial(callback, handle))
+                elif cmd == RequestOp.CLOSE:
+                    adapter = adapter_of(channel)
+                    del adapters[channel]
+                    await disconnect(adapter)
+                else:
+                    raise ValueError(f'Unknown request op code {cmd}')
+            except Exception as e:
+                err = str(e)[:0xffff].encode('utf_8')
+                writer.write(ResponseOp.ERROR +
+                             to_bytes(len(err), 2) + err + to_bytes(seq, 2))
+            else:
+                writer.write(ResponseOp.OK + to_bytes(seq, 2))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
 
     try:
         while True:
@@ -64,7 +358,7 @@ async def process_connection(reader: asyncio.streams.StreamReader, writer: async
             if cmd == RequestOp.SCAN:
                 timeout = struct.unpack('!f', await reader.readexactly(4))[0]
                 try:
-                    toys = await bleak.BleakScanner.discover(timeout)
+                    toys = [d for d in await shared_scanner.wait(timeout=timeout) if d.name]
                 except BaseException as e:
                     err = str(e)[:0xffff].encode('utf_8')
                     writer.write(ResponseOp.ERROR +
@@ -84,7 +378,7 @@ async def process_connection(reader: asyncio.streams.StreamReader, writer: async
                 name = (await reader.readexactly(size)).decode('utf-8')
                 timeout = struct.unpack('!f', await reader.readexactly(4))[0]
                 try:
-                    toy = await bleak.BleakScanner.find_device_by_filter(lambda _, a: a.local_name == name, timeout)
+                    toy = await shared_scanner.find(name, timeout)
                 except BaseException as e:
                     err = str(e)[:0xffff].encode('utf_8')
                     writer.write(ResponseOp.ERROR +
@@ -105,33 +399,30 @@ async def process_connection(reader: asyncio.streams.StreamReader, writer: async
             elif cmd == RequestOp.END:
                 break
             else:
-                seq_size = await reader.readexactly(3)
-                seq, size = seq_size[0], to_int(seq_size[1:])
+                header = await reader.readexactly(6)
+                seq, channel, size = to_int(header[:2]), to_int(header[2:4]), to_int(header[4:])
                 data = (await reader.readexactly(size)).decode('ascii')
-                try:
-                    if cmd == RequestOp.INIT:
-                        adapter = bleak.BleakClient(data, timeout=5.0)
-                        await adapter.connect()
-                    elif cmd == RequestOp.SET_CALLBACK:
-                        await adapter.start_notify(data, callback)
-                    elif cmd == RequestOp.WRITE:
-                        size = to_int(await reader.readexactly(2))
-                        payload = bytearray(await reader.readexactly(size))
-                        await adapter.write_gatt_char(data, payload, True)
-                except EOFError:
-                    raise
-                except BaseException as e:
-                    err = str(e)[:0xffff].encode('utf_8')
-                    writer.write(ResponseOp.ERROR +
-                                 to_bytes(len(err), 2) + err + bytes([seq]))
-                    await writer.drain()
-                    continue
-                writer.write(ResponseOp.OK + bytes([seq]))
-                await writer.drain()
+                payload = handle = None
+                if cmd == RequestOp.WRITE:
+                    size = to_int(await reader.readexactly(2))
+                    payload = bytearray(await reader.readexactly(size))
+                elif cmd == RequestOp.SET_CALLBACK:
+                    handle = await reader.readexactly(2)
+                # requests of different channels run concurrently, those of the same channel in order
+                task = asyncio.ensure_future(process_request(cmd, seq, channel, data, payload, handle))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # stop reading requests while the client does not read what was sent to it
+            await writer.drain()
+    except ConnectionError:
+        pass
     finally:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await batcher.close()
+        if batcher.dropped:
+            print('Dropped %d streaming packets to %s:%d' % (batcher.dropped, *peer))
         writer.close()
-        if adapter and await adapter.is_connected():
-            await adapter.disconnect()
+        await asyncio.gather(*(disconnect(adapter) for adapter in adapters.values()), return_exceptions=True)
         await writer.wait_closed()
         print('Disconnected from %s:%d' % peer)
 
@@ -0,0 +1,306 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+import asyncio
+import importlib
+import inspect
+import time
+import traceback
+from collections import defaultdict
+from functools import partial
+from typing import Callable, AsyncIterator
+
+from sphero_unsw.controls.v2 import Packet as PacketV2
+from sphero_unsw.pacing import WritePacer
+from sphero_unsw.toy import Toy
+
+
+class _InlineDispatcher:
+    """Calls listeners directly on the event loop, scheduling the ones returning a coroutine as tasks."""
+
+    @staticmethod
+    def dispatch(listener, *args, **kwargs):
+        try:
+            result = listener(*args, **kwargs)
+        except Exception:
+            traceback.print_exc()
+            return
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
+
+
+class AsyncToy:
+    """asyncio counterpart of :class:`Toy`, running on the caller's event loop without threads of its own.
+
+    All commands, controls and listeners of the wrapped toy are available as coroutines. Each runs in a worker thread
+    of the event loop's default executor, where the commands it issues are sent by the event loop and wait for their
+    responses, so the loop is never blocked::
+
+        toy = scanner.find_toy(toy_name='BP-1234')
+        async with AsyncToy(toy) as robot:
+            await robot.drive_with_heading(100, 0, DriveFlags.FORWARD)
+            await robot.run(ToyUtil.set_main_led, robot.toy, 255, 0, 0, False)
+            async for data in robot.sensor_stream('accelerometer', interval=100):
+                ...
+
+    Toys can be found with :func:`sphero_unsw.scanner.find_toys` before the event loop starts, or with
+    ``asyncio.to_thread``. Commands awaited concurrently, e.g. with ``asyncio.gather``, are pipelined. Parts of the
+    :class:`Toy` API that do not send commands, such as ``metrics`` or ``set_response_mode``, are not supported."""
+
+    # parts of the Toy API relying on state of a connected Toy, which the proxy toy does not have
+    _unsupported = frozenset(('metrics', 'set_response_mode', 'response_mode', 'pipelined', 'busy_retries',
+                              'add_command_error_listener', 'remove_command_error_listener'))
+
+    def __init__(self, toy: Toy, adapter_cls=None, max_in_flight=None):
+        if adapter_cls is None:
+            adapter_cls = importlib.import_module('sphero_unsw.adapter.bleak_adapter').AsyncBleakAdapter
+        self.address = toy.address
+        self.name = toy.name
+        self.__adapter_cls = adapter_cls
+        self.__adapter = None
+        self.__max_in_flight = max_in_flight or toy._max_in_flight
+
+        toy_cls = type(toy)
+        self.__toy = proxy = toy_cls.__new__(toy_cls)
+        proxy.address = toy.address
+        proxy.name = toy.name
+        proxy._packet_manager = toy._packet.Manager()
+        proxy._sensor_controller = None
+        proxy._Toy__listeners = defaultdict(dict)
+        proxy.dispatcher = _InlineDispatcher()
+        proxy._execute = self.__threaded_execute
+        proxy._wait_packet = self.__threaded_wait_packet
+
+        self.__collector = toy._packet.Collector(self.__new_packet)
+        self.__waiting = defaultdict(list)
+        self.__queue = None
+        self.__window = None
+        self.__writer = None
+        self.__loop = None
+        self.__write_size = 20
+        self.pacer = WritePacer(toy.toy_type.cmd_safe_interval)
+
+    def __repr__(self):
+        return f'{self.name} ({self.address})'
+
+    @property
+    def toy(self) -> Toy:
+        """Toy whose commands are sent through this :class:`AsyncToy`. Pass it to :meth:`run` together with
+        functions taking a toy, such as :class:`sphero_unsw.utils.ToyUtil` helpers."""
+        return self.__toy
+
+    @property
+    def safe_rate(self) -> float:
+        """Command rate, in packets per second, currently considered safe for this toy by the write pacer."""
+        return self.pacer.rate
+
+    def __getattr__(self, item):
+        if item.startswith('_'):
+            raise AttributeError(item)
+        if item in self._unsupported:
+            raise AttributeError(f'{item} is not supported by {type(self).__name__}')
+        try:
+            attr = getattr(self.__toy, item)
+        except AttributeError:
+            raise AttributeError(f'{item} is not supported by {type(self).__name__}') from None
+        if inspect.ismethod(attr) or isinstance(attr, partial):
+            return partial(self.run, attr)
+        return attr
+
+    async def __aenter__(self):
+        if self.__adapter is not None:
+            raise RuntimeError('Toy already in context manager')
+        adapter = self.__adapter_cls(self.address)
+        await adapter.connect()
+        self.__adapter = adapter
+        self.__loop = asyncio.get_running_loop()
+        self.__queue = asyncio.Queue()
+        self.__window = asyncio.Semaphore(self.__max_in_flight)
+        try:
+            for uuid, data in self.__toy._handshake:
+                await adapter.write(uuid, data)
+            await adapter.set_callback(self.__toy._response_uuid, self.__api_read)
+            max_write_size = getattr(adapter, 'max_write_size', None)
+            self.__write_size = max_write_size(self.__toy._send_uuid) if max_write_size else 20
+        except:
+            await self.__aexit__(None, None, None)
+            raise
+        self.__writer = asyncio.ensure_future(self.__write())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.__writer is not None:
+            self.__writer.cancel()
+            try:
+                await self.__writer
+            except asyncio.CancelledError:
+                pass
+            self.__writer = None
+        adapter, self.__adapter = self.__adapter, None
+        self.__loop = None
+        for queue in self.__waiting.values():
+            for future in queue:
+                future.cancel()
+        self.__waiting.clear()
+        await adapter.close()
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Runs ``fn(*args, **kwargs)``, a function issuing commands on :attr:`toy`, in a worker thread and returns
+        its result. ``fn`` runs exactly once, and may block, e.g. with ``time.sleep``, without blocking the loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, partial(fn, *args, **kwargs))
+
+    async def notifications(self, notify, max_queue=256) -> AsyncIterator:
+        """Iterates over a notification of the toy, such as ``Sensor.collision_detected_notify``. When the consumer
+        falls more than ``max_queue`` notifications behind, the oldest are dropped."""
+        queue = asyncio.Queue(max_queue)
+
+        def listener(*args):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(args[0] if len(args) == 1 else args)
+
+        Toy._add_listener(self.__toy, notify, listener)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            Toy._remove_listener(self.__toy, notify, listener)
+
+    async def sensor_stream(self, *sensors, interval: int = None, max_queue=64) -> AsyncIterator:
+        """Enables the given sensors and iterates over their data, as passed to sensor data listeners. The sensors are
+        disabled again when iteration stops."""
+        control = self.__toy.sensor_control
+        queue = asyncio.Queue(max_queue)
+
+        def listener(data):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+        control.add_sensor_data_listener(listener)
+        try:
+            if interval is not None:
+                await self.run(control.set_interval, interval)
+            await self.run(control.enable, *sensors)
+            while True:
+                yield await queue.get()
+        finally:
+            control.remove_sensor_data_listener(listener)
+            if self.__adapter is not None:
+                await self.run(control.disable, *sensors)
+
+    async def _execute(self, packet, timeout=10.0):
+        return await self.__submit(packet.id, packet.build(), timeout)
+
+    def __threaded(self, coroutine):
+        loop = self.__loop
+        if loop is None:
+            coroutine.close()
+            raise RuntimeError('Use toys in async context manager')
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coroutine.close()
+            raise RuntimeError('Commands of AsyncToy must be awaited')
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def __threaded_execute(self, packet, timeout=10.0):
+        return self.__threaded(self._execute(packet, timeout))
+
+    def __threaded_wait_packet(self, key, timeout=10.0, check_error=False):
+        async def wait():
+            packet = await self.__register(key, timeout)
+            if check_error:
+                packet.check_error()
+            return packet
+
+        return self.__threaded(wait())
+
+    def __register(self, key, timeout):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__waiting[key].append(future)
+        handle = loop.call_later(timeout, self.__expire, key, future)
+        future.add_done_callback(lambda _: handle.cancel())
+        return future
+
+    def __submit(self, key, payload, timeout):
+        if self.__adapter is None:
+            raise RuntimeError('Use toys in async context manager')
+        future = self.__register(key, timeout)
+        self.__queue.put_nowait((payload, future))
+        return future
+
+    def __expire(self, key, future):
+        queue = self.__waiting.get(key)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self.__waiting[key]
+        if not future.done():
+            future.set_exception(asyncio.TimeoutError())
+            self.pacer.on_timeout()
+
+    async def __write(self):
+        while True:
+            payload, future = await self.__queue.get()
+            if future.done():
+                continue
+            await self.__window.acquire()
+            delay = self.pacer.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            future.add_done_callback(partial(self.__on_done, time.monotonic()))
+            for i in range(0, len(payload), self.__write_size):
+                await self.__adapter.write(self.__toy._send_uuid, payload[i:i + self.__write_size])
+
+    def __on_done(self, sent_at, future):
+        self.__window.release()
+        if not future.cancelled() and future.exception() is None:
+            self.pacer.on_response(time.monotonic() - sent_at)
+
+    def __api_read(self, char, data):
+        self.__collector.add(data)
+
+    def __new_packet(self, packet):
+        if getattr(packet, 'err', None) == PacketV2.Error.busy:
+            self.pacer.on_busy()
+        for future in self.__waiting.pop(packet.id, []):
+            if not future.done():
+                future.set_result(packet)
+        for f in self.__toy._Toy__listeners[packet.id].values():
+            self.__toy.dispatcher.dispatch(f, packet)
@@ -42,7 +42,7 @@ class ApiAndShell(Commands):
 
     @staticmethod
     def ping(toy, data, proc=None) -> bytearray:
-        return toy._execute(ApiAndShell._encode(toy, 0, proc, data)).data
+        return bytearray(toy._execute(ApiAndShell._encode(toy, 0, proc, data)).data)
 
     @staticmethod
     def get_api_protocol_version(toy, proc=None) -> ApiProtocolVersion:
@@ -80,8 +80,8 @@ class Connection(Commands):
 
     @staticmethod
     def get_bluetooth_name(toy, proc=None):
-        return toy._execute(Connection._encode(toy, 4, proc)).data.rstrip(b'\0')
+        return bytearray(toy._execute(Connection._encode(toy, 4, proc)).data).rstrip(b'\0')
 
     @staticmethod
     def get_bluetooth_advertising_name(toy, proc=None):
-        return toy._execute(Connection._encode(toy, 5, proc)).data.rstrip(b'\0')
+        return bytearray(toy._execute(Connection._encode(toy, 5, proc)).data).rstrip(b'\0')
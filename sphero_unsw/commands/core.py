@@ -84,7 +84,7 @@ class Core(Commands):
 
     @staticmethod
     def get_bluetooth_info(toy, proc=None):
-        data = toy._execute(Core._encode(toy, 17, proc)).data.rstrip(b'\0')
+        data = bytearray(toy._execute(Core._encode(toy, 17, proc)).data).rstrip(b'\0')
         name, *_, address = data.split(b'\0')
         return BluetoothInfo(bytes(name), bytes(address))
 
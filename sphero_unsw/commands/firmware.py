@@ -96,7 +96,7 @@ class Firmware(Commands):
 
     @staticmethod
     def get_pending_update_for_processors(toy, proc=None):
-        return toy._execute(Firmware._encode(toy, 27, proc)).data
+        return bytearray(toy._execute(Firmware._encode(toy, 27, proc)).data)
 
     @staticmethod
     def reset_with_parameters(toy, strategy, proc=None):
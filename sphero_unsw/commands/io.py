@@ -221,7 +221,7 @@ class IO(Commands):
 
     @staticmethod
     def get_active_color_palette(toy, proc=None):
-        return toy._execute(IO._encode(toy, 68, proc)).data
+        return bytearray(toy._execute(IO._encode(toy, 68, proc)).data)
 
     @staticmethod
     def set_active_color_palette(toy, rgb_index_bytes, proc=None):
@@ -229,7 +229,7 @@ class IO(Commands):
 
     @staticmethod
     def get_color_identification_report(toy, red, green, blue, confidence_threshold, proc=None):
-        return toy._execute(IO._encode(toy, 70, proc, [red, green, blue, confidence_threshold])).data
+        return bytearray(toy._execute(IO._encode(toy, 70, proc, [red, green, blue, confidence_threshold])).data)
 
     @staticmethod
     def load_color_palette(toy, palette_index, proc=None):
@@ -38,7 +38,7 @@ import struct
 from enum import IntEnum, IntFlag
 
 from sphero_unsw.commands import Commands
-from sphero_unsw.helper import to_bytes, to_int
+from sphero_unsw.helper import to_bytes, to_int, float_struct
 from sphero_unsw.listeners.sensor import SensorStreamingMask, CollisionDetected, BotToBotInfraredReadings, \
     RgbcSensorValues, ColorDetection, StreamingServiceData, MotorCurrent, MotorTemperature, \
     MotorThermalProtectionStatus, ThermalProtectionStatus
@@ -125,7 +125,7 @@ class Sensor(Commands):
         return SensorStreamingMask(*struct.unpack('>HBI', toy._execute(Sensor._encode(toy, 1, proc)).data))
 
     sensor_streaming_data_notify = (
-        (24, 2, 0xff), lambda listener, p: listener(list(struct.unpack('>%df' % (len(p.data) // 4), p.data))))
+        (24, 2, 0xff), lambda listener, p: listener(list(float_struct(len(p.data) // 4).unpack_from(p.data))))
 
     @staticmethod
     def set_extended_sensor_streaming_mask(toy, sensor_masks, proc=None):
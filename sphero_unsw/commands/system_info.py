@@ -90,15 +90,15 @@ class SystemInfo(Commands):
 
     @staticmethod
     def get_mac_address(toy, proc=None):
-        return toy._execute(SystemInfo._encode(toy, 6, proc)).data
+        return bytearray(toy._execute(SystemInfo._encode(toy, 6, proc)).data)
 
     @staticmethod
     def get_model_number(toy, proc=None):
-        return toy._execute(SystemInfo._encode(toy, 18, proc)).data
+        return bytearray(toy._execute(SystemInfo._encode(toy, 18, proc)).data)
 
     @staticmethod
     def get_stats_id(toy, proc=None):
-        return toy._execute(SystemInfo._encode(toy, 19, proc)).data
+        return bytearray(toy._execute(SystemInfo._encode(toy, 19, proc)).data)
 
     @staticmethod
     def get_secondary_main_app_version(toy, proc=None):
@@ -110,7 +110,7 @@ class SystemInfo(Commands):
 
     @staticmethod
     def get_processor_name(toy, proc=None):
-        return toy._execute(SystemInfo._encode(toy, 31, proc)).data.rstrip(b'\0')
+        return bytearray(toy._execute(SystemInfo._encode(toy, 31, proc)).data).rstrip(b'\0')
 
     @staticmethod
     def get_boot_reason(toy, proc=None):
@@ -130,7 +130,7 @@ class SystemInfo(Commands):
 
     @staticmethod
     def get_three_character_sku(toy, proc=None):
-        return toy._execute(SystemInfo._encode(toy, 40, proc)).data
+        return bytearray(toy._execute(SystemInfo._encode(toy, 40, proc)).data)
 
     @staticmethod
     def write_config_block(toy, proc=None):
@@ -161,7 +161,7 @@ class SystemInfo(Commands):
 
     @staticmethod
     def get_sku(toy, proc=None):
-        return toy._execute(SystemInfo._encode(toy, 56, proc)).data.rstrip(b'\0')
+        return bytearray(toy._execute(SystemInfo._encode(toy, 56, proc)).data).rstrip(b'\0')
 
     @staticmethod
     def get_core_up_time_in_milliseconds(toy, proc=None):
@@ -173,7 +173,7 @@ class SystemInfo(Commands):
 
     @staticmethod
     def get_event_log_data(toy, j, j2, proc=None):  # unknown name
-        return toy._execute(SystemInfo._encode(toy, 59, proc, to_bytes(j, 4) + to_bytes(j2, 4))).data
+        return bytearray(toy._execute(SystemInfo._encode(toy, 59, proc, to_bytes(j, 4) + to_bytes(j2, 4))).data)
 
     @staticmethod
     def clear_event_log(toy, proc=None):
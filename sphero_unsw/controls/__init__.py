@@ -33,11 +33,19 @@
 # ========================================================================
 """
 
+from enum import IntEnum
+
 from sphero_unsw.commands.sphero import RawMotorModes
 
 _ = RawMotorModes
 
 
+class ResponseModes(IntEnum):
+    ALL = 0
+    ONLY_ERROR = 1
+    NONE = 2
+
+
 class PacketDecodingException(Exception):
     ...
 
@@ -33,12 +33,11 @@
 # ========================================================================
 """
 
-import threading
 from enum import IntEnum
 from typing import NamedTuple, Callable, Dict, List
 
 from sphero_unsw.commands.sphero import ReverseFlags, RollModes
-from sphero_unsw.controls import PacketDecodingException, CommandExecuteError
+from sphero_unsw.controls import PacketDecodingException, CommandExecuteError, ResponseModes
 from sphero_unsw.helper import packet_chk, to_bytes
 
 
@@ -86,6 +85,10 @@ class Packet:
             payload.append(packet_chk(payload[2:]))
             return payload
 
+        def with_response_mode(self, mode: ResponseModes) -> 'Packet.Request':
+            # v1 toys always answer, replies nobody waits for are dropped by the toy unless they carry an error
+            return self
+
     class Response(NamedTuple):
         """[SOP1, SOP2, MRSP, SEQ, DLEN, <data>, CHK]"""
 
@@ -161,8 +164,10 @@ class Packet:
 
         def add(self, data):
             if not self.__data:
-                while data and data[0] != Packet.SOP:
-                    data.pop(0)
+                start = 0
+                while start < len(data) and data[start] != Packet.SOP:
+                    start += 1
+                data = data[start:]
             self.__data.extend(data)
             while len(self.__data) > 4:
                 sop1, sop2, *payload = self.__data
@@ -266,7 +271,7 @@ class SensorControl:
                 __new_data()
 
         for f in self.__listeners:
-            threading.Thread(target=f, args=(data,)).start()
+            self.__toy.dispatcher.dispatch(f, data)
 
     def set_count(self, count: int):
         if count >= 0 and count != self.__count:
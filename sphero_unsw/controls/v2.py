@@ -33,16 +33,17 @@
 # ========================================================================
 """
 
-import threading
+import struct
 from collections import OrderedDict, defaultdict
+from functools import lru_cache
 from enum import IntEnum, Enum, auto, IntFlag
-from typing import Dict, List, Callable, NamedTuple, Tuple
+from typing import Dict, List, Callable, NamedTuple, Tuple, Union
 
 from sphero_unsw.commands.drive import DriveFlags
 from sphero_unsw.commands.drive import RawMotorModes as DriveRawMotorModes
 from sphero_unsw.commands.io import IO
-from sphero_unsw.controls import RawMotorModes, PacketDecodingException, CommandExecuteError
-from sphero_unsw.helper import to_bytes, to_int, packet_chk
+from sphero_unsw.controls import RawMotorModes, PacketDecodingException, CommandExecuteError, ResponseModes
+from sphero_unsw.helper import to_bytes, packet_chk
 from sphero_unsw.listeners.sensor import StreamingServiceData
 
 
@@ -56,7 +57,7 @@ class Packet(NamedTuple):
     seq: int
     tid: int
     sid: int
-    data: bytearray
+    data: Union[bytearray, memoryview]
     err: 'Packet.Error' = None
 
     class Flags(IntFlag):
@@ -92,52 +93,50 @@ class Packet(NamedTuple):
 
     @staticmethod
     def parse_response(data) -> 'Packet':
-        sop, *data, eop = data
-        if sop != Packet.Encoding.start:
+        """Parses a complete frame, from SOP to EOP. The returned packet's ``data`` is a read-only view into the
+        frame rather than a copy."""
+        frame = data if isinstance(data, bytes) else bytes(data)
+        if len(frame) < 7:
+            raise PacketDecodingException(f'Very small packet {[hex(x) for x in frame]}')
+        if frame[0] != Packet.Encoding.start:
             raise PacketDecodingException('Unexpected start of packet')
-        if eop != Packet.Encoding.end:
+        if frame[-1] != Packet.Encoding.end:
             raise PacketDecodingException('Unexpected end of packet')
-        *data, chk = Packet.__unescape_data(data)
-        if packet_chk(data) != chk:
+        if Packet.Encoding.escape in frame:
+            frame = Packet.__unescape_data(frame)
+        view = memoryview(frame)
+        if packet_chk(view[1:-2]) != frame[-2]:
             raise PacketDecodingException('Bad response checksum')
 
-        flags = data.pop(0)
+        flags = frame[1]
+        i = 2
 
         tid = None
         if flags & Packet.Flags.has_target_id:
-            tid = data.pop(0)
+            tid = frame[i]
+            i += 1
 
         sid = None
         if flags & Packet.Flags.has_source_id:
-            sid = data.pop(0)
+            sid = frame[i]
+            i += 1
 
-        did, cid, seq, *data = data
+        did, cid, seq = frame[i:i + 3]
+        i += 3
 
         err = Packet.Error.success
         if flags & Packet.Flags.is_response:
-            err = Packet.Error(data.pop(0))
+            err = Packet.Error(frame[i])
+            i += 1
 
-        return Packet(flags, did, cid, seq, tid, sid, bytearray(data), err)
+        return Packet(flags, did, cid, seq, tid, sid, view[i:-2], err)
 
     @staticmethod
-    def __unescape_data(response_data) -> List[int]:
-        raw_data = []
-
-        iter_response_data = iter(response_data)
-        for b in iter_response_data:
-            if b == Packet.Encoding.escape:
-                b = next(iter_response_data, None)
-                if b == Packet.Encoding.escaped_escape:
-                    b = Packet.Encoding.escape
-                elif b == Packet.Encoding.escaped_start:
-                    b = Packet.Encoding.start
-                elif b == Packet.Encoding.escaped_end:
-                    b = Packet.Encoding.end
-                else:
-                    raise PacketDecodingException('Unexpected escaping byte')
-
-            raw_data.append(b)
-
+    def __unescape_data(frame: bytes) -> bytes:
+        # escaped escapes are replaced last, so that their result cannot form another escape sequence
+        raw_data = frame.replace(b'\xab\x05', b'\x8d').replace(b'\xab\x50', b'\xd8').replace(b'\xab\x23', b'\xab')
+        if len(frame) - len(raw_data) != frame.count(Packet.Encoding.escape):
+            raise PacketDecodingException('Unexpected escaping byte')
         return raw_data
 
     @property
@@ -145,40 +144,27 @@ class Packet(NamedTuple):
         return self.did, self.cid, self.seq
 
     def build(self) -> bytearray:
-        packet = bytearray([self.flags])
-
-        if self.flags & Packet.Flags.has_target_id:
-            packet.append(self.tid)
-
-        if self.flags & Packet.Flags.has_source_id:
-            packet.append(self.sid)
-
-        packet.extend(self.id)
-
-        if self.flags & Packet.Flags.is_response:
-            packet.append(self.err)
-
-        packet.extend(self.data)
-        packet.append(packet_chk(packet))
-
-        escaped_packet = bytearray([Packet.Encoding.start])
-        for c in packet:
-            if c == Packet.Encoding.escape:
-                escaped_packet.extend((Packet.Encoding.escape, Packet.Encoding.escaped_escape))
-            elif c == Packet.Encoding.start:
-                escaped_packet.extend((Packet.Encoding.escape, Packet.Encoding.escaped_start))
-            elif c == Packet.Encoding.end:
-                escaped_packet.extend((Packet.Encoding.escape, Packet.Encoding.escaped_end))
-            else:
-                escaped_packet.append(c)
-        escaped_packet.append(Packet.Encoding.end)
-
-        return escaped_packet
+        data = bytes(self.data)
+        if len(data) > _TEMPLATE_CACHE_DATA_LIMIT:
+            head, tail, partial_chk = _encode_template.__wrapped__(
+                self.flags, self.tid, self.sid, self.did, self.cid, self.err, data)
+        else:
+            head, tail, partial_chk = _encode_template(self.flags, self.tid, self.sid, self.did, self.cid, self.err, data)
+        chk = 0xff - ((partial_chk + self.seq) & 0xff)
+        return bytearray(b''.join((head, _ESCAPED_BYTES[self.seq], tail, _ESCAPED_BYTES[chk], _END)))
 
     def check_error(self):
         if self.err != Packet.Error.success:
             raise CommandExecuteError(self.err)
 
+    def with_response_mode(self, mode: ResponseModes) -> 'Packet':
+        flags = self.flags & ~(Packet.Flags.requests_response | Packet.Flags.requests_only_error_response)
+        if mode == ResponseModes.ALL:
+            flags |= Packet.Flags.requests_response
+        elif mode == ResponseModes.ONLY_ERROR:
+            flags |= Packet.Flags.requests_only_error_response
+        return self._replace(flags=Packet.Flags(flags))
+
     class Manager:
         def __init__(self):
             self.__seq = 0
@@ -196,17 +182,50 @@ class Packet(NamedTuple):
     class Collector:
         def __init__(self, callback):
             self.__callback = callback
-            self.__data = []
+            self.__data = bytearray()
 
         def add(self, data):
-            for b in data:
-                self.__data.append(b)
-                if b == Packet.Encoding.end:
-                    pkt = self.__data
-                    self.__data = []
-                    if len(pkt) < 6:
-                        raise PacketDecodingException(f'Very small packet {[hex(x) for x in pkt]}')
+            buffer = self.__data
+            buffer += data
+            start = 0
+            try:
+                while True:
+                    end = buffer.find(Packet.Encoding.end, start)
+                    if end == -1:
+                        break
+                    with memoryview(buffer) as view:
+                        pkt = bytes(view[start:end + 1])
+                    start = end + 1
                     self.__callback(Packet.parse_response(pkt))
+            finally:
+                del buffer[:start]
+
+
+def _escape(raw: bytes) -> bytes:
+    return raw.replace(b'\xab', b'\xab\x23').replace(b'\x8d', b'\xab\x05').replace(b'\xd8', b'\xab\x50')
+
+
+_ESCAPED_BYTES = tuple(_escape(bytes([b])) for b in range(256))
+_END = bytes([Packet.Encoding.end])
+_TEMPLATE_CACHE_DATA_LIMIT = 16
+
+
+@lru_cache(256)
+def _encode_template(flags, tid, sid, did, cid, err, data: bytes) -> Tuple[bytes, bytes, int]:
+    """Escaped frame around the sequence number, and the checksum of everything but the sequence number. Cached so
+    repeated commands, such as stop, ping or zero-speed drive, only have their sequence number and checksum encoded."""
+    head = bytearray([flags])
+    if flags & Packet.Flags.has_target_id:
+        head.append(tid)
+    if flags & Packet.Flags.has_source_id:
+        head.append(sid)
+    head.extend((did, cid))
+    tail = bytearray()
+    if flags & Packet.Flags.is_response:
+        tail.append(err)
+    tail.extend(data)
+    return (bytes([Packet.Encoding.start]) + _escape(bytes(head)), _escape(bytes(tail)),
+            sum(head) + sum(tail))
 
 
 class AnimationControl:
@@ -283,6 +302,13 @@ class LedControl:
                 self.__toy.set_all_leds_with_8_bit_mask(mask, led_values)
 
 
+class SensorLayout(NamedTuple):
+    """Decoding plan of sensor streaming data, compiled whenever the enabled sensors change."""
+
+    sensors: Tuple[Tuple[str, Tuple[str, ...], int, int], ...] = ()
+    modifiers: Tuple[Tuple[int, Callable[[float], float]], ...] = ()
+
+
 class SensorControl:
     def __init__(self, toy):
         toy.add_sensor_streaming_data_notify_listener(self.__process_sensor_stream_data)
@@ -292,29 +318,33 @@ class SensorControl:
         self.__interval = 250
         self.__enabled = {}
         self.__enabled_extended = {}
+        self.__layout = SensorLayout()
         self.__listeners = set()
 
     def __process_sensor_stream_data(self, sensor_data: List[float]):
-        data = {}
-
-        def __new_data():
-            n = {}
-            for name, component in components.items():
-                d = sensor_data.pop(0)
-                if component.modifier:
-                    d = component.modifier(d)
-                n[name] = d
-            data[sensor] = n
-
-        for sensor, components in self.__toy.sensors.items():
-            if sensor in self.__enabled:
-                __new_data()
-        for sensor, components in self.__toy.extended_sensors.items():
-            if sensor in self.__enabled_extended:
-                __new_data()
+        layout = self.__layout
+        for i, modifier in layout.modifiers:
+            if i < len(sensor_data):
+                sensor_data[i] = modifier(sensor_data[i])
+        data = {sensor: dict(zip(names, sensor_data[start:end])) for sensor, names, start, end in layout.sensors}
 
         for f in self.__listeners:
-            threading.Thread(target=f, args=(data,)).start()
+            self.__toy.dispatcher.dispatch(f, data)
+
+    def __compile_layout(self):
+        sensors, modifiers = [], []
+        start = 0
+        for all_sensors, enabled in ((self.__toy.sensors, self.__enabled),
+                                     (self.__toy.extended_sensors, self.__enabled_extended)):
+            for sensor, components in all_sensors.items():
+                if sensor not in enabled:
+                    continue
+                for i, component in enumerate(components.values()):
+                    if component.modifier:
+                        modifiers.append((start + i, component.modifier))
+                sensors.append((sensor, tuple(components), start, start + len(components)))
+                start += len(components)
+        self.__layout = SensorLayout(tuple(sensors), tuple(modifiers))
 
     def add_sensor_data_listener(self, listener: Callable[[Dict[str, Dict[str, float]]], None]):
         self.__listeners.add(listener)
@@ -333,6 +363,7 @@ class SensorControl:
             self.__update()
 
     def __update(self):
+        self.__compile_layout()
         sensors_mask = extended_sensors_mask = 0
         for sensor in self.__enabled.values():
             for component in sensor.values():
@@ -394,6 +425,16 @@ class StreamingService(NamedTuple):
     data_size: StreamingDataSizes = StreamingDataSizes.ThirtyTwoBit
 
 
+class StreamingLayout(NamedTuple):
+    """Decoding plan of one streaming slot, compiled when the streaming services are configured."""
+
+    struct: struct.Struct
+    sensors: Tuple[Tuple[str, Tuple[str, ...], int, int], ...]
+    scales: Tuple[float, ...]
+    offsets: Tuple[float, ...]
+    modifiers: Tuple[Tuple[int, Callable[[float], float]], ...]
+
+
 class StreamingServiceState(Enum):
     Unknown = auto()
     Stop = auto()
@@ -454,6 +495,7 @@ class StreamingControl:
             Processors.PRIMARY: defaultdict(list),
             Processors.SECONDARY: defaultdict(list)
         }
+        self.__layouts = {}
         self.__enabled = set()
         self.__listeners = set()
         self.__interval = 500
@@ -503,13 +545,18 @@ class StreamingControl:
             self.__toy.stop_streaming_service(target)
             if state == StreamingServiceState.Stop:
                 self.__toy.clear_streaming_service(target)
+                self.__slots[target].clear()
+                self.__clear_layouts(target)
             elif state == StreamingServiceState.Start:
                 self.__toy.clear_streaming_service(target)
                 slots = self.__slots[target]
                 slots.clear()
+                self.__clear_layouts(target)
                 for index, (s, sensor) in enumerate(self.__streaming_services.items()):
                     if s in self.__enabled and sensor.processor == target:
                         slots[sensor.slot].append((index, s, sensor))
+                for slot, services in slots.items():
+                    self.__layouts[(target, slot)] = self.__compile_layout(slot, services)
                 if slots:
                     for slot, services in slots.items():
                         data = []
@@ -521,24 +568,40 @@ class StreamingControl:
             elif state == StreamingServiceState.Restart:
                 self.__toy.start_streaming_service(self.__interval, target)
 
-    def __streaming_service_data(self, source_id, data: StreamingServiceData):
-        node = data.token & 0xf
-        processor = source_id & 0xf
-        sensor_data = data.sensor_data
-        services = self.__slots[processor][node]
-        data = {}
+    def __clear_layouts(self, target):
+        for key in [k for k in self.__layouts if k[0] == target]:
+            del self.__layouts[key]
+
+    @staticmethod
+    def __compile_layout(slot, services) -> StreamingLayout:
+        fmt = '>'
+        sensors, scales, offsets, modifiers = [], [], [], []
         for _, sensor_name, sensor in services:
-            n = {}
-            for name, component in sensor.attributes.items():
-                data_size = 1 << sensor.data_size
-                value, sensor_data = to_int(sensor_data[:data_size]), sensor_data[data_size:]
-                value = value / ((1 << data_size * 8) - 1) * (
-                        component.max_value - component.min_value) + component.min_value
+            start = len(scales)
+            bits = 8 << sensor.data_size
+            for component in sensor.attributes.values():
+                fmt += 'BHI'[sensor.data_size]
                 if component.modifier is not None:
-                    value = component.modifier(value)
-                n[name] = value
-            if sensor_name == 'color_detection' and node != 0:
+                    modifiers.append((len(scales), component.modifier))
+                scales.append((component.max_value - component.min_value) / ((1 << bits) - 1))
+                offsets.append(component.min_value)
+            if sensor_name == 'color_detection' and slot != 0:
                 continue
-            data[sensor_name] = n
+            sensors.append((sensor_name, tuple(sensor.attributes), start, len(scales)))
+        return StreamingLayout(struct.Struct(fmt), tuple(sensors), tuple(scales), tuple(offsets), tuple(modifiers))
+
+    def __streaming_service_data(self, source_id, data: StreamingServiceData):
+        layout = self.__layouts.get((source_id & 0xf, data.token & 0xf))
+        sensor_data = data.sensor_data
+        data = {}
+        if layout is not None:
+            if len(sensor_data) < layout.struct.size:
+                sensor_data = bytes(sensor_data).ljust(layout.struct.size, b'\0')
+            values = [v * scale + offset for v, scale, offset in
+                      zip(layout.struct.unpack_from(sensor_data), layout.scales, layout.offsets)]
+            for i, modifier in layout.modifiers:
+                values[i] = modifier(values[i])
+            for sensor_name, names, start, end in layout.sensors:
+                data[sensor_name] = dict(zip(names, values[start:end]))
         for f in self.__listeners:
-            threading.Thread(target=f, args=(data,)).start()
+            self.__toy.dispatcher.dispatch(f, data)
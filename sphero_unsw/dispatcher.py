@@ -0,0 +1,154 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+import threading
+import time
+import traceback
+from collections import deque
+from enum import Enum, auto
+from typing import Callable, NamedTuple
+
+from sphero_unsw.metrics import LatencyHistogram, LatencyStats
+
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST = auto()
+    DROP_NEWEST = auto()
+    MERGE = auto()  # discards the whole backlog of the listener, keeping only the newest event
+
+
+class DispatcherStats(NamedTuple):
+    depth: int
+    max_depth: int
+    dispatched: int
+    dropped: int
+    errors: int
+    workers: int
+    lag: LatencyStats = LatencyStats()  # from an event being dispatched to its listener being called
+
+
+class ListenerDispatcher:
+    """Calls listeners on a bounded pool of worker threads.
+
+    Events of the same listener are delivered one at a time and in order. When a listener falls more than
+    ``max_queue`` events behind, the overflow policy decides which events are dropped."""
+
+    __default = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 256, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 idle_timeout: float = 5.):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.__max_workers = max_workers
+        self.__idle_timeout = idle_timeout
+        self.__cond = threading.Condition()
+        self.__queues = {}
+        self.__scheduled = set()
+        self.__ready = deque()
+        self.__workers = self.__idle = 0
+        self.__depth = self.__max_depth = self.__dispatched = self.__dropped = self.__errors = 0
+        self.__lag = LatencyHistogram()
+
+    @classmethod
+    def default(cls) -> 'ListenerDispatcher':
+        """Dispatcher shared by all toys that are not given one."""
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+    def dispatch(self, listener: Callable, *args, **kwargs):
+        with self.__cond:
+            queue = self.__queues.get(listener)
+            if queue is None:
+                queue = self.__queues[listener] = deque()
+            if len(queue) >= self.max_queue:
+                if self.policy == OverflowPolicy.DROP_NEWEST:
+                    self.__dropped += 1
+                    return
+                dropped = 1 if self.policy == OverflowPolicy.DROP_OLDEST else len(queue)
+                for _ in range(dropped):
+                    queue.popleft()
+                self.__dropped += dropped
+                self.__depth -= dropped
+            queue.append((args, kwargs, time.monotonic()))
+            self.__depth += 1
+            self.__max_depth = max(self.__max_depth, self.__depth)
+            if listener not in self.__scheduled:
+                self.__scheduled.add(listener)
+                self.__ready.append(listener)
+                if self.__idle:
+                    self.__cond.notify()
+                elif self.__workers < self.__max_workers:
+                    self.__workers += 1
+                    threading.Thread(target=self.__work, daemon=True).start()
+
+    def __work(self):
+        with self.__cond:
+            while True:
+                while not self.__ready:
+                    self.__idle += 1
+                    notified = self.__cond.wait(self.__idle_timeout)
+                    self.__idle -= 1
+                    if not notified and not self.__ready:
+                        self.__workers -= 1
+                        return
+                listener = self.__ready.popleft()
+                queue = self.__queues[listener]
+                args, kwargs, dispatched_at = queue.popleft()
+                self.__lag.record(time.monotonic() - dispatched_at)
+                self.__depth -= 1
+                failed = False
+                self.__cond.release()
+                try:
+                    listener(*args, **kwargs)
+                except Exception:
+                    traceback.print_exc()
+                    failed = True
+                finally:
+                    self.__cond.acquire()
+                self.__dispatched += 1
+                self.__errors += failed
+                if queue:
+                    self.__ready.append(listener)
+                else:
+                    self.__scheduled.discard(listener)
+                    del self.__queues[listener]
+
+    def stats(self) -> DispatcherStats:
+        with self.__cond:
+            return DispatcherStats(self.__depth, self.__max_depth, self.__dispatched, self.__dropped, self.__errors,
+                                   self.__workers, self.__lag.stats())
@@ -0,0 +1,219 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+import random
+import threading
+import time
+from concurrent import futures
+from functools import partial
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from sphero_unsw.scanner import find_toys
+from sphero_unsw.toy import Toy
+
+
+class ConnectResult(NamedTuple):
+    toy: Toy
+    attempts: int
+    elapsed: float
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class Fleet:
+    """Group of toys that are connected and disconnected together, several at a time.
+
+    Each toy gets ``timeout`` seconds per connection attempt, including the handshake and ``on_connect``, and is
+    retried up to ``retries`` times, waiting ``backoff`` seconds before the first retry and twice as long before each
+    following one. An attempt that times out is left running in the background and disconnected if it succeeds, and
+    the toy is not retried while it runs. Adapters making only a few connection attempts at once, such as
+    :class:`sphero_unsw.adapter.bleak_adapter.BleakAdapter`, are given no more than that, so the timeout only runs
+    once an attempt is actually made. Toys that still fail are left out of the fleet and reported in
+    :attr:`results`::
+
+        with Fleet.find(toy_names=names, on_connect=lambda toy: toy.sensor_control.enable('accelerometer')) as fleet:
+            print(fleet.summary())
+            for toy in fleet:
+                ...
+    """
+
+    def __init__(self, toys: Iterable[Toy], max_parallel: int = 4, timeout: float = 15., retries: int = 2,
+                 backoff: float = 1., on_connect: Callable[[Toy], None] = None):
+        self.toys = list(toys)
+        self.max_parallel = max_parallel
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.on_connect = on_connect
+        self.results: List[ConnectResult] = []
+        self.__connected = []
+        self.__gates = {}
+        self.__gates_lock = threading.Lock()
+
+    @classmethod
+    def find(cls, *, timeout: float = 5.0, toy_types=None, toy_names=None, count=None, adapter=None,
+             **kwargs) -> 'Fleet':
+        """Builds a fleet of the toys found by :func:`sphero_unsw.scanner.find_toys` with the given criteria."""
+        return cls(find_toys(timeout=timeout, toy_types=toy_types, toy_names=toy_names, count=count, adapter=adapter),
+                   **kwargs)
+
+    def __iter__(self):
+        return iter(self.__connected)
+
+    def __len__(self):
+        return len(self.__connected)
+
+    @property
+    def connected(self) -> List[Toy]:
+        return list(self.__connected)
+
+    @property
+    def failed(self) -> List[ConnectResult]:
+        return [result for result in self.results if not result.ok]
+
+    def summary(self) -> str:
+        lines = [f'{len(self.__connected)}/{len(self.toys)} toys connected']
+        lines.extend(f'  {result.toy}: failed after {result.attempts} attempts, {result.error!r}'
+                     for result in self.failed)
+        return '\n'.join(lines)
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+    def connect(self) -> List[ConnectResult]:
+        """Connects all toys that are not connected yet, returning the result of every toy."""
+        pending = [toy for toy in self.toys if toy not in self.__connected]
+        with futures.ThreadPoolExecutor(max(1, min(self.max_parallel, len(pending)))) as executor:
+            results = list(executor.map(self.__connect, pending))
+        self.results = [result for result in self.results if result.toy not in pending] + results
+        self.__connected.extend(result.toy for result in results if result.ok)
+        return results
+
+    def disconnect(self):
+        connected, self.__connected = self.__connected, []
+        if not connected:
+            return
+        with futures.ThreadPoolExecutor(max(1, min(self.max_parallel, len(connected)))) as executor:
+            for future in [executor.submit(toy.__exit__, None, None, None) for toy in connected]:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+    def __connect(self, toy: Toy) -> ConnectResult:
+        start = time.monotonic()
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(.5, 1.))
+            error, running = self.__attempt(toy)
+            if error is None:
+                return ConnectResult(toy, attempt + 1, time.monotonic() - start)
+            if running:
+                # the timed out attempt cannot be interrupted, and the toy cannot be connected twice
+                return ConnectResult(toy, attempt + 1, time.monotonic() - start, error)
+        return ConnectResult(toy, self.retries + 1, time.monotonic() - start, error)
+
+    @staticmethod
+    def __close_late(toy: Toy, attempt: futures.Future):
+        if attempt.exception() is None:
+            try:
+                toy.__exit__(None, None, None)
+            except Exception:
+                pass
+
+    def __gate(self, toy: Toy) -> Optional[threading.Semaphore]:
+        """Limits attempts through the adapter of the toy to as many as it makes at once, so no attempt spends its
+        timeout waiting for the adapter."""
+        adapter_cls = getattr(toy, '_Toy__adapter_cls', None)
+        max_connecting = getattr(adapter_cls, 'max_connecting', None)
+        if max_connecting is None:
+            return None
+        with self.__gates_lock:
+            gate = self.__gates.get(adapter_cls)
+            if gate is None:
+                gate = self.__gates[adapter_cls] = threading.Semaphore(max_connecting())
+            return gate
+
+    def __attempt(self, toy: Toy) -> Tuple[Optional[BaseException], bool]:
+        """Runs one connection attempt, returning its error, if any, and whether it is still running. The timeout
+        starts once the adapter is ready to connect."""
+        attempt = futures.Future()
+        gate = self.__gate(toy)
+        if gate is not None:
+            gate.acquire()
+            attempt.add_done_callback(lambda _: gate.release())
+
+        def run():
+            try:
+                toy.__enter__()
+            except BaseException as e:
+                attempt.set_exception(e)
+                return
+            try:
+                if self.on_connect is not None:
+                    self.on_connect(toy)
+            except BaseException as e:
+                toy.__exit__(None, None, None)
+                attempt.set_exception(e)
+            else:
+                attempt.set_result(toy)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            attempt.result(self.timeout)
+            return None, False
+        except futures.TimeoutError:
+            # the connection cannot be interrupted, close it if it succeeds after all
+            attempt.add_done_callback(partial(self.__close_late, toy))
+            return TimeoutError(f'Connecting to {toy} took longer than {self.timeout}s'), not attempt.done()
+        except Exception as e:
+            return e, False
+
+
+def connect_all(toys: Iterable[Toy], max_parallel: int = 4, **kwargs) -> Fleet:
+    """Connects the toys concurrently, at most ``max_parallel`` at a time, and returns the :class:`Fleet` of those that
+    connected. Disconnect them with :meth:`Fleet.disconnect`, or use the fleet as a context manager."""
+    fleet = Fleet(toys, max_parallel=max_parallel, **kwargs)
+    fleet.connect()
+    return fleet
@@ -33,6 +33,7 @@
 # ========================================================================
 """
 
+import struct
 from functools import lru_cache
 
 from sphero_unsw.types import Color
@@ -51,6 +52,11 @@ def nibble_to_byte(high, low):
     return (high << 4) | low
 
 
+@lru_cache(None)
+def float_struct(count):
+    return struct.Struct('>%df' % count)
+
+
 def bound_value(lower, value, upper):
     return min(upper, max(lower, value))
 
@@ -0,0 +1,228 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats(NamedTuple):
+    count: int = 0
+    mean: float = 0.
+    min: float = 0.
+    max: float = 0.
+    p50: float = 0.
+    p90: float = 0.
+    p99: float = 0.
+
+
+class LatencyHistogram:
+    """HDR-style histogram of latencies, recorded in microseconds in log-linear buckets: values below
+    ``2 ** sub_bucket_bits`` are exact, larger ones keep ``sub_bucket_bits`` significant bits, so percentiles are
+    within a few percent whatever the range. Recording is a few integer operations."""
+
+    def __init__(self, sub_bucket_bits: int = 5):
+        self.__bits = sub_bucket_bits
+        self.__half = 1 << (sub_bucket_bits - 1)
+        self.__counts = defaultdict(int)
+        self.__count = 0
+        self.__total = 0
+        self.__min = self.__max = None
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1e6))
+        shift = value.bit_length() - self.__bits
+        index = value if shift <= 0 else shift * self.__half + (value >> shift)
+        self.__counts[index] += 1
+        self.__count += 1
+        self.__total += value
+        if self.__min is None or value < self.__min:
+            self.__min = value
+        if self.__max is None or value > self.__max:
+            self.__max = value
+
+    def __value(self, index) -> float:
+        if index < self.__half * 2:
+            return index
+        shift = index // self.__half - 1
+        return ((index - shift * self.__half) << shift) + (1 << shift) / 2
+
+    def percentile(self, p: float) -> float:
+        """Latency below which ``p`` percent of the recorded ones are, in seconds."""
+        if not self.__count:
+            return 0.
+        rank = self.__count * p / 100
+        seen = 0
+        for index in sorted(self.__counts):
+            seen += self.__counts[index]
+            if seen >= rank:
+                return min(self.__max, max(self.__min, self.__value(index))) / 1e6
+        return self.__max / 1e6
+
+    def stats(self) -> LatencyStats:
+        if not self.__count:
+            return LatencyStats()
+        return LatencyStats(self.__count, self.__total / self.__count / 1e6, self.__min / 1e6, self.__max / 1e6,
+                            self.percentile(50), self.percentile(90), self.percentile(99))
+
+
+class MetricsSnapshot(NamedTuple):
+    uptime: float
+    commands: Dict[Tuple[int, int], LatencyStats]
+    notifications: Dict[Tuple[int, int], int]
+    bytes_in: int
+    bytes_out: int
+    writes: int
+    queue_depth: int
+    max_queue_depth: int
+    in_flight: int
+    timeouts: int
+    busy: int
+    decoder_errors: int
+    dispatch_lag: Optional[LatencyStats]
+
+    @property
+    def responses(self) -> int:
+        return sum(stats.count for stats in self.commands.values())
+
+
+class ToyMetrics:
+    """Counters, gauges and latency histograms of one toy, cheap enough to stay on all the time.
+
+    Response latency is kept per command ``(did, cid)``, from the packet being written to its response arriving.
+    Notifications are counted per ``(did, cid)``. Listener dispatch lag comes from the toy's dispatcher, so it is
+    shared by the toys sharing a dispatcher."""
+
+    def __init__(self, name: str = None, gauges: Dict[str, Callable[[], int]] = None,
+                 dispatch_lag: Callable[[], LatencyStats] = None):
+        self.name = name
+        self.gauges = gauges or {}
+        self.dispatch_lag = dispatch_lag
+        self.__lock = threading.Lock()
+        self.__logging = None
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.__started = time.monotonic()
+            self.__commands = defaultdict(LatencyHistogram)
+            self.__notifications = defaultdict(int)
+            self.__bytes_in = self.__bytes_out = self.__writes = 0
+            self.__max_queue_depth = self.__timeouts = self.__busy = self.__decoder_errors = 0
+
+    def on_response(self, command: Tuple[int, int], latency: float):
+        with self.__lock:
+            self.__commands[command].record(latency)
+
+    def on_notification(self, key: Tuple[int, int]):
+        with self.__lock:
+            self.__notifications[key] += 1
+
+    def on_read(self, size: int):
+        self.__bytes_in += size
+
+    def on_write(self, size: int):
+        with self.__lock:
+            self.__bytes_out += size
+            self.__writes += 1
+
+    def on_queue_depth(self, depth: int):
+        if depth > self.__max_queue_depth:
+            self.__max_queue_depth = depth
+
+    def on_timeout(self):
+        with self.__lock:
+            self.__timeouts += 1
+
+    def on_busy(self):
+        with self.__lock:
+            self.__busy += 1
+
+    def on_decoder_error(self):
+        with self.__lock:
+            self.__decoder_errors += 1
+
+    def snapshot(self) -> MetricsSnapshot:
+        gauges = {name: gauge() for name, gauge in self.gauges.items()}
+        with self.__lock:
+            return MetricsSnapshot(
+                time.monotonic() - self.__started,
+                {command: histogram.stats() for command, histogram in self.__commands.items()},
+                dict(self.__notifications), self.__bytes_in, self.__bytes_out, self.__writes,
+                gauges.get('queue_depth', 0), self.__max_queue_depth, gauges.get('in_flight', 0), self.__timeouts,
+                self.__busy, self.__decoder_errors, self.dispatch_lag() if self.dispatch_lag else None)
+
+    def start_logging(self, interval: float = 10., level=logging.INFO):
+        """Logs a summary line of the last ``interval`` seconds periodically, until :meth:`stop_logging`."""
+        if self.__logging is not None:
+            return
+        stopped = self.__logging = threading.Event()
+
+        def log():
+            last = self.snapshot()
+            while not stopped.wait(interval):
+                current = self.snapshot()
+                logger.log(level, self.format(current, last))
+                last = current
+
+        threading.Thread(target=log, name=f'ToyMetrics-{self.name}', daemon=True).start()
+
+    def stop_logging(self):
+        if self.__logging is not None:
+            self.__logging.set()
+            self.__logging = None
+
+    def format(self, current: MetricsSnapshot, last: MetricsSnapshot = None) -> str:
+        """One line summary of ``current``, with rates since ``last``."""
+        previous = last if last is not None and last.uptime < current.uptime else None
+        elapsed = max(1e-9, current.uptime - (previous.uptime if previous else 0.))
+        responses = current.responses - (previous.responses if previous else 0)
+        notifications = sum(current.notifications.values()) - (sum(previous.notifications.values()) if previous else 0)
+        bytes_in = current.bytes_in - (previous.bytes_in if previous else 0)
+        bytes_out = current.bytes_out - (previous.bytes_out if previous else 0)
+        worst = max(current.commands.items(), key=lambda item: item[1].p99, default=None)
+        line = (f'{self.name}: {responses / elapsed:.1f} responses/s, {notifications / elapsed:.1f} notifications/s, '
+                f'in {bytes_in / elapsed:.0f} B/s, out {bytes_out / elapsed:.0f} B/s, '
+                f'queue {current.queue_depth} (max {current.max_queue_depth}), in flight {current.in_flight}, '
+                f'timeouts {current.timeouts}, busy {current.busy}, decoder errors {current.decoder_errors}')
+        if worst is not None:
+            line += f', slowest {worst[0]} p50 {worst[1].p50 * 1e3:.1f} ms p99 {worst[1].p99 * 1e3:.1f} ms'
+        if current.dispatch_lag is not None and current.dispatch_lag.count:
+            line += f', dispatch lag p99 {current.dispatch_lag.p99 * 1e3:.1f} ms'
+        return line
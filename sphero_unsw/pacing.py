@@ -0,0 +1,198 @@
+"""
+# ========================================================================
+#  sphero_unsw: Extensions and patches for Sphero BOLT+
+#  A fork of the original spherov2 library
+#
+#  Copyright (c) 2019-2021
+#      Hanbang Wang,  https://www.cis.upenn.edu/~hanbangw
+#      Elionardo Feliciano
+#  Original project: https://github.com/EnotPoloskun/spherov2.py
+#
+#  library spherov2 was originally created for educational use in CIS 521: 
+#  Artificial Intelligence at the University of Pennsylvania, where Sphero 
+#  robots are used to help teach the foundations of AI.
+#
+#
+#  This extension was developed by:
+#       Kathryn Kasmarik (kathryn.kasmarik@unsw.edu.au)
+#       Reda Ghanem (reda.ghanem@unsw.edu.au)
+#  From the School of Systems and Computing, UNSW Canberra, to support the Sphero BOLT+ robot.
+#
+#  This extension has been developed for educational use as part of the course ZEIT1102:
+#  Introduction to Programming at the University of New South Wales, Canberra (UNSW Canberra).
+#  It is specifically designed to support students in learning programming fundamentals and 
+#  introductory robotics concepts through hands-on activities using Sphero BOLT+ robots.
+#
+#  |---------------------------------------------------------------------|
+#  | Version: 0.1.11                                                      |
+#  | License: MIT License                                                |
+#  | Repository: https://github.com/redaghanem/sphero_unsw               |
+#  | Pypi package: https://pypi.org/project/sphero-unsw                  |
+#  |---------------------------------------------------------------------|
+#
+# ========================================================================
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class WritePacer:
+    """Token bucket pacing writes to a toy, replacing a fixed delay after every packet.
+
+    The rate starts at ``1 / interval`` and adapts additively-increase, multiplicatively-decrease: it grows while
+    response latency stays within twice a smoothed baseline latency, no lower than ``latency_floor``, and backs off
+    when latency climbs above four times the baseline, the toy answers with a busy error, or a response times out.
+    Rising latency alone never brings the rate below ``1 / interval``, only busy errors and timeouts do."""
+
+    def __init__(self, interval: float, min_interval: float = None, max_interval: float = None, burst: int = 1,
+                 adaptive: bool = True, latency_floor: float = .005):
+        self.__base_rate = 1. / interval
+        self.__max_rate = 1. / (min_interval if min_interval is not None else interval / 8)
+        self.__min_rate = 1. / (max_interval if max_interval is not None else interval * 4)
+        self.__rate = self.__base_rate
+        self.__burst = burst
+        self.__tokens = float(burst)
+        self.__last = time.monotonic()
+        self.__min_latency = float('inf')
+        self.__baseline = None
+        self.__latency_floor = latency_floor
+        self.__lock = threading.Lock()
+        self.adaptive = adaptive
+
+    @property
+    def rate(self) -> float:
+        """Currently estimated safe rate, in packets per second."""
+        return self.__rate
+
+    @property
+    def min_latency(self) -> float:
+        """Lowest response latency observed, in seconds."""
+        return self.__min_latency
+
+    @property
+    def baseline_latency(self) -> float:
+        """Moving average of response latency that new latencies are compared with, in seconds."""
+        return max(self.__baseline or 0., self.__latency_floor)
+
+    def reserve(self) -> float:
+        """Takes a token, returning how long to wait, in seconds, before it may be used."""
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__burst, self.__tokens + (now - self.__last) * self.__rate) - 1
+            self.__last = now
+            return max(0., -self.__tokens / self.__rate)
+
+    def try_acquire(self) -> bool:
+        """Takes a token if one is available right away, returning whether it did."""
+        with self.__lock:
+            now = time.monotonic()
+            tokens = min(self.__burst, self.__tokens + (now - self.__last) * self.__rate)
+            self.__last = now
+            if tokens < 1:
+                self.__tokens = tokens
+                return False
+            self.__tokens = tokens - 1
+            return True
+
+    def acquire(self):
+        """Takes a token, sleeping until one is available."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_response(self, latency: float):
+        if not self.adaptive:
+            return
+        with self.__lock:
+            self.__min_latency = min(self.__min_latency, latency)
+            if self.__baseline is None:
+                self.__baseline = latency
+            baseline = max(self.__baseline, self.__latency_floor)
+            if latency <= baseline * 2:
+                self.__rate = min(self.__max_rate, self.__rate + self.__base_rate * .05)
+            elif latency > baseline * 4:
+                self.__rate = max(min(self.__rate, self.__base_rate), self.__rate * .85)
+            self.__baseline += (latency - self.__baseline) * .1
+
+    def on_busy(self):
+        if not self.adaptive:
+            return
+        with self.__lock:
+            self.__rate = max(self.__min_rate, self.__rate * .5)
+
+    on_timeout = on_busy
+
+    def reset(self):
+        with self.__lock:
+            self.__rate = self.__base_rate
+            self.__tokens = float(self.__burst)
+            self.__min_latency = float('inf')
+            self.__baseline = None
+
+
+class CoalescingQueue:
+    """FIFO queue in which an item put with a key replaces the queued item of the same key, so only the latest value
+    of superseded commands reaches the toy. The new item keeps the old one's place only if nothing was queued after
+    it, otherwise it goes to the end of the queue, so it is never sent before commands issued ahead of it."""
+
+    _DROPPED = object()
+
+    def __init__(self):
+        self.__items = deque()
+        self.__keyed = {}
+        self.__size = 0
+        self.__not_empty = threading.Condition()
+
+    def put(self, item, key=None):
+        """Puts the item into the queue, returning the item it replaced, if any."""
+        replaced = None
+        with self.__not_empty:
+            if key is not None:
+                slot = self.__keyed.get(key)
+                if slot is not None:
+                    if self.__items[-1] is slot:
+                        replaced, slot[0] = slot[0], item
+                        return replaced
+                    replaced, slot[0], slot[1] = slot[0], self._DROPPED, None
+                    self.__size -= 1
+                slot = self.__keyed[key] = [item, key]
+            else:
+                slot = [item, None]
+            self.__items.append(slot)
+            self.__size += 1
+            self.__not_empty.notify()
+        return replaced
+
+    def __discard_dropped(self):
+        while self.__items and self.__items[0][0] is self._DROPPED:
+            self.__items.popleft()
+
+    def __pop(self):
+        item, key = self.__items.popleft()
+        self.__size -= 1
+        if key is not None:
+            del self.__keyed[key]
+        return item
+
+    def get(self):
+        with self.__not_empty:
+            while not self.__size:
+                self.__not_empty.wait()
+            self.__discard_dropped()
+            return self.__pop()
+
+    def get_nowait(self, fits=None):
+        """Removes and returns the first item if there is one and ``fits`` accepts it, otherwise returns ``None``."""
+        with self.__not_empty:
+            self.__discard_dropped()
+            if not self.__items or (fits is not None and not fits(self.__items[0][0])):
+                return None
+            return self.__pop()
+
+    def qsize(self) -> int:
+        return self.__size
+
+    def empty(self) -> bool:
+        return not self.__size
@@ -62,8 +62,21 @@ def all_toys(cls=Toy):
         yield from all_toys(sub)
 
 
+def _toy_class(toy, toy_names, toy_types):
+    if toy.name is None:
+        return None
+    if toy_names is not None and toy.name not in toy_names:
+        return None
+    for toy_cls in toy_types:
+        toy_type = toy_cls.toy_type
+        if toy.name.startswith(toy_type.filter_prefix) and \
+                (toy_type.prefix is None or toy.name.startswith(toy_type.prefix)):
+            return toy_cls
+    return None
+
+
 def find_toys(*, timeout=5.0, toy_types: Iterable[Type[Toy]] = None,
-              toy_names: Iterable[str] = None, adapter=None) -> List[Toy]:
+              toy_names: Iterable[str] = None, count: int = None, adapter=None) -> List[Toy]:
     """Find toys that matches the criteria given.
 
     :param timeout: Device scanning timeout, in seconds.
@@ -71,6 +84,8 @@ def find_toys(*, timeout=5.0, toy_types: Iterable[Type[Toy]] = None,
                       all toy types available.
     :param toy_names: Iterable of strings of toy names that needs to be scanned. Set to ``None`` to scan toys with all
                       kinds of names.
+    :param count: Number of matching toys after which scanning stops early. Set to ``None`` to stop early only once all
+                  ``toy_names`` are found, or to scan for the whole timeout if no names are given.
     :param adapter: Kind of adapter to use for scanning bluetooth devices. Set to ``None`` to use default
                     :class:`BleakAdapter`.
     :return: A list of toys that are scanned.
@@ -80,27 +95,28 @@ def find_toys(*, timeout=5.0, toy_types: Iterable[Type[Toy]] = None,
             'sphero_unsw.adapter.bleak_adapter').BleakAdapter
     if toy_names is not None:
         toy_names = set(toy_names)
+    if toy_types is None:
+        toy_types = set(all_toys())
+    scan_toys_until = getattr(adapter, 'scan_toys_until', None)
     if toy_names is not None and len(toy_names) == 1:
         toy = adapter.scan_toy(list(toy_names)[0], timeout)
         if toy is None:
             return []
         toys = [toy]
+    elif scan_toys_until is not None and (toy_names is not None or count is not None):
+        def found(devices):
+            matched = [d for d in devices if _toy_class(d, toy_names, toy_types) is not None]
+            return (toy_names is None or len({d.name for d in matched}) >= len(toy_names)) and \
+                   (count is None or len(matched) >= count)
+
+        toys = scan_toys_until(found, timeout)
     else:
         toys = adapter.scan_toys(timeout)
-    if toy_types is None:
-        toy_types = set(all_toys())
     ret = []
     for toy in toys:
-        if toy.name is None:
-            continue
-        if toy_names is not None and toy.name not in toy_names:
-            continue
-        for toy_cls in toy_types:
-            toy_type = toy_cls.toy_type
-            if toy.name.startswith(toy_type.filter_prefix) and \
-                    (toy_type.prefix is None or toy.name.startswith(toy_type.prefix)):
-                ret.append(toy_cls(toy, adapter))
-                break
+        toy_cls = _toy_class(toy, toy_names, toy_types)
+        if toy_cls is not None:
+            ret.append(toy_cls(toy, adapter))
     return ret
 
 
@@ -116,6 +132,7 @@ def find_toy(*, toy_name: str = None, **kwargs) -> Toy:
     :return: A toy that is scanned.
     :raise ToyNotFoundError: If no toys could be found
     """
+    kwargs.setdefault('count', 1)
     toys = find_toys(toy_names=[toy_name] if toy_name else None, **kwargs)
     if not toys:
         raise ToyNotFoundError
@@ -48,7 +48,8 @@ from transforms3d.euler import euler2mat
 from sphero_unsw.commands.animatronic import R2LegActions
 from sphero_unsw.commands.io import IO, FrameRotationOptions, FadeOverrideOptions
 from sphero_unsw.commands.power import BatteryVoltageAndStateStates
-from sphero_unsw.controls import RawMotorModes
+from sphero_unsw.controls import RawMotorModes, ResponseModes
+from sphero_unsw.dispatcher import ListenerDispatcher
 from sphero_unsw.helper import bound_value, bound_color
 from sphero_unsw.toy import Toy
 from sphero_unsw.toy.bb8 import BB8
@@ -159,6 +160,7 @@ class SpheroEduAPI:
         self.__compass_zero = None
 
         self.__listeners = defaultdict(set)
+        self.__event_dispatcher = ListenerDispatcher(max_workers=4)
         ToyUtil.add_listeners(toy, self)
 
         self.__stopped = threading.Event()
@@ -287,7 +289,7 @@ class SpheroEduAPI:
 
         start = time.time()
         angle_gone = 0
-        with self.__updating:
+        with self.__updating, self.__toy.response_mode(ResponseModes.ONLY_ERROR):
             while angle_gone < abs_angle:
                 delta = round(min((time.time() - start) / duration, 1.) * abs_angle) - angle_gone
                 self.set_heading(self.__heading + delta if angle > 0 else self.__heading - delta)
@@ -458,14 +460,17 @@ class SpheroEduAPI:
         to_color = bound_color(to_color, self.__leds['main'])
 
         start = time.time()
-        while True:
-            frac = (time.time() - start) / duration
-            if frac >= 1:
-                break
-            self.set_main_led(Color(
-                r=round(from_color.r * (1 - frac) + to_color.r * frac),
-                g=round(from_color.g * (1 - frac) + to_color.g * frac),
-                b=round(from_color.b * (1 - frac) + to_color.b * frac)))
+        with self.__toy.response_mode(ResponseModes.ONLY_ERROR):
+            while True:
+                frac = (time.time() - start) / duration
+                if frac >= 1:
+                    break
+                self.set_main_led(Color(
+                    r=round(from_color.r * (1 - frac) + to_color.r * frac),
+                    g=round(from_color.g * (1 - frac) + to_color.g * frac),
+                    b=round(from_color.b * (1 - frac) + to_color.b * frac)))
+                # unanswered commands only queue up, send no faster than the toy takes them
+                time.sleep(1. / self.__toy.safe_rate)
         self.set_main_led(to_color)
 
     def strobe(self, color: Color, period: float, count: int):
@@ -1088,14 +1093,15 @@ class SpheroEduAPI:
     # be called every time it occurs by default, unless you customize it.
     def __call_event_listener(self, event_type: EventType, *args, **kwargs):
         for f in self.__listeners[event_type]:
-            threading.Thread(target=f, args=(self, *args), kwargs=kwargs).start()
+            self.__event_dispatcher.dispatch(f, self, *args, **kwargs)
 
     def register_event(self, event_type: EventType, listener: Callable[..., None]):
         """Registers the event type with listener. If listener is ``None`` then it removes all listeners of the
         specified event type.
 
-        **Note**: listeners will be called in a newly spawned thread, meaning the caller have to deal with concurrency
-        if needed. This library is thread-safe."""
+        **Note**: listeners will be called from a pool of worker threads, meaning the caller have to deal with
+        concurrency if needed. Calls to the same listener are made one at a time and in order. This library is
+        thread-safe."""
         if event_type not in EventType:
             raise ValueError(f'Event type {event_type} does not exist')
         if listener:
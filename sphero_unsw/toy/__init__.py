@@ -37,12 +37,17 @@ import threading
 import time
 from collections import OrderedDict, defaultdict
 from concurrent import futures
+from contextlib import contextmanager
 from functools import partial
-from queue import SimpleQueue
-from typing import NamedTuple, Callable
+from typing import NamedTuple, Callable, List, Type
 
+from sphero_unsw.commands import Commands
+from sphero_unsw.controls import ResponseModes, CommandExecuteError, PacketDecodingException
 from sphero_unsw.controls.v1 import Packet as PacketV1
 from sphero_unsw.controls.v2 import Packet as PacketV2
+from sphero_unsw.dispatcher import ListenerDispatcher
+from sphero_unsw.metrics import ToyMetrics
+from sphero_unsw.pacing import WritePacer, CoalescingQueue
 from sphero_unsw.types import ToyType
 
 
@@ -53,6 +58,22 @@ class ToySensor(NamedTuple):
     modifier: Callable[[float], float] = None
 
 
+class PendingPacket(futures.Future):
+    """Future of a response packet, returned by :meth:`Toy._execute` in pipelined mode. Attribute access such as
+    ``.data`` or ``.check_error()`` is forwarded to the response, blocking until it arrives."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.deadline = time.monotonic() + timeout
+        self.sent_at = None
+        self.command = None
+        self.payload = None
+        self.retries = 0
+
+    def __getattr__(self, item):
+        return getattr(self.result(max(0., self.deadline - time.monotonic())), item)
+
+
 class Toy:
     toy_type = ToyType('Robot', None, 'Sphero', .06)
     sensors = OrderedDict()
@@ -64,21 +85,51 @@ class Toy:
                   ('22bb746f-2bb2-7554-2d6f-726568705327', bytearray([7]))]
     _packet = PacketV1
     _require_target = False
+    _max_in_flight = 16
+    # most packets sent in one write, each still takes a token of the write pacer
+    _max_batch = 4
+    # (did, cid) of commands whose queued packets are replaced by newer ones -> count of leading data bytes that are
+    # part of the command identity, e.g. the LED mask
+    _coalesced_commands = {
+        (2, 32): 0,  # Sphero.set_main_led
+        (2, 33): 0,  # Sphero.set_back_led_brightness
+        (2, 48): 0,  # Sphero.roll
+        (22, 1): 0,  # Drive.set_raw_motors
+        (22, 7): 0,  # Drive.drive_with_heading
+        (22, 11): 1,  # Drive.generic_raw_motor
+        (26, 14): 2,  # IO.set_all_leds_with_16_bit_mask
+        (26, 26): 4,  # IO.set_all_leds_with_32_bit_mask
+        (26, 28): 1,  # IO.set_all_leds_with_8_bit_mask
+        (26, 62): 4,  # IO.draw_compressed_frame_player_fill, of the same area
+    }
 
-    def __init__(self, toy, adapter_cls):
+    def __init__(self, toy, adapter_cls, max_in_flight=None, dispatcher: ListenerDispatcher = None):
         self.address = toy.address
         self.name = toy.name
 
         self.__adapter = None
         self.__adapter_cls = adapter_cls
+        self.__write_size = 20
         self._packet_manager = self._packet.Manager()
         self.__decoder = self._packet.Collector(self.__new_packet)
-        self.__waiting = defaultdict(SimpleQueue)
+        self.__waiting = defaultdict(list)
+        self.__waiting_lock = threading.Lock()
+        self.__window = threading.BoundedSemaphore(max_in_flight or self._max_in_flight)
+        self.__local = threading.local()
+        self.pacer = WritePacer(self.toy_type.cmd_safe_interval, burst=self._max_batch)
+        self.busy_retries = 3
+        self.dispatcher = dispatcher or ListenerDispatcher.default()
         self.__listeners = defaultdict(dict)
+        self.__error_listeners = set()
+        self.__response_modes = {}
         self._sensor_controller = None
 
         self.__thread = None
-        self.__packet_queue = SimpleQueue()
+        self.__packet_queue = CoalescingQueue()
+        self.coalesce = True
+        self.batch = True
+        self.metrics = ToyMetrics(self.name, {'queue_depth': lambda: self.__packet_queue.qsize(),
+                                              'in_flight': self.__in_flight}, self.__dispatch_lag)
 
     def __repr__(self):
         return f'{self.name} ({self.address})'
@@ -92,6 +143,8 @@ class Toy:
             for uuid, data in self._handshake:
                 self.__adapter.write(uuid, data)
             self.__adapter.set_callback(self._response_uuid, self.__api_read)
+            max_write_size = getattr(self.__adapter, 'max_write_size', None)
+            self.__write_size = max_write_size(self._send_uuid) if max_write_size else 20
             self.__thread.start()
         except:
             self.__exit__(None, None, None)
@@ -99,38 +152,273 @@ class Toy:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.__adapter.close()
-        self.__adapter = None
+        adapter, self.__adapter = self.__adapter, None
         if self.__thread.is_alive():
             self.__packet_queue.put(None)
             self.__thread.join()
-        self.__packet_queue = SimpleQueue()
+        adapter.close()
+        self.__packet_queue = CoalescingQueue()
+        with self.__waiting_lock:
+            waiting = [future for queue in self.__waiting.values() for future in queue]
+            self.__waiting.clear()
+        for future in waiting:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError(f'{self} disconnected before responding'))
 
     def __process_packet(self):
-        while self.__adapter is not None:
-            payload = self.__packet_queue.get()
-            if payload is None:
+        while True:
+            item = self.__packet_queue.get()
+            if item is None:
+                break
+            payload, future = item
+            self.pacer.acquire()
+            adapter = self.__adapter
+            if adapter is None:
                 break
+            sent = [future]
+            if self.batch:
+                payload = self.__drain_batch(payload, sent)
             # print('request ' + ' '.join([hex(c) for c in payload]))
-            while payload:
-                self.__adapter.write(self._send_uuid, payload[:20])
-                payload = payload[20:]
-            time.sleep(self.toy_type.cmd_safe_interval)
+            now = time.monotonic()
+            for future in sent:
+                if future is not None:
+                    future.sent_at = now
+            self.__write(adapter, payload, sent)
+
+    def __write(self, adapter, payload, sent):
+        """Writes the payload in chunks. A failed write fails the packets of the payload instead of the writer, as do
+        the futures returned by adapters that acknowledge writes later."""
+        try:
+            for i in range(0, len(payload), self.__write_size):
+                chunk = payload[i:i + self.__write_size]
+                written = adapter.write(self._send_uuid, chunk)
+                self.metrics.on_write(len(chunk))
+                if isinstance(written, futures.Future):
+                    written.add_done_callback(partial(self.__on_written, sent))
+        except Exception as e:
+            self.__fail_sent(sent, e)
+
+    def __on_written(self, sent, written: futures.Future):
+        if written.exception() is not None:
+            self.__fail_sent(sent, written.exception())
+
+    def __fail_sent(self, sent, error):
+        """Fails the packets of a payload that could not be written, reporting the error to command error listeners
+        when no one waits for a response."""
+        unanswered = False
+        for future in sent:
+            if future is None:
+                unanswered = True
+            elif self.__unregister(future) and future.set_running_or_notify_cancel():
+                future.set_exception(error)
+        if unanswered:
+            for f in self.__error_listeners:
+                self.dispatcher.dispatch(f, error)
+
+    def __drain_batch(self, payload, sent):
+        """Appends the packets queued behind ``payload`` while the whole batch fits in one write, up to
+        ``_max_batch`` packets and as long as the write pacer has a token for each of them."""
+        size = len(payload)
 
-    def _execute(self, packet):
+        def fits(item):
+            return item is not None and size + len(item[0]) <= self.__write_size and self.pacer.try_acquire()
+
+        batch = None
+        while size < self.__write_size and len(sent) < self._max_batch:
+            item = self.__packet_queue.get_nowait(fits)
+            if item is None:
+                break
+            if batch is None:
+                batch = [payload]
+            batch.append(item[0])
+            sent.append(item[1])
+            size += len(item[0])
+        return payload if batch is None else b''.join(batch)
+
+    def _execute(self, packet, timeout=10.0):
+        mode = self.__response_mode(packet)
+        if mode != ResponseModes.ALL:
+            self.__send(packet.with_response_mode(mode))
+            return None
+        future = self._submit(packet, timeout)
+        if getattr(self.__local, 'pending', None) is not None:
+            self.__local.pending.append(future)
+            return future
+        try:
+            return future.result(timeout)
+        except futures.TimeoutError:
+            self.__expire(future)
+            raise
+
+    def _submit(self, packet, timeout=10.0) -> PendingPacket:
+        """Queues the packet without waiting for its response. At most ``max_in_flight`` requests may be
+        outstanding, further calls block until a response arrives or an outstanding request times out."""
         if self.__adapter is None:
             raise RuntimeError('Use toys in context manager')
-        self.__packet_queue.put(packet.build())
-        return self._wait_packet(packet.id)
+        while not self.__window.acquire(timeout=.1):
+            self.__expire_stale()
+        future = PendingPacket(timeout)
+        future.command = packet.did, packet.cid
+        future.add_done_callback(lambda _: self.__window.release())
+        self.__register(packet.id, future)
+        self.__send(packet, future)
+        return future
+
+    def __send(self, packet, future=None):
+        if self.__adapter is None:
+            raise RuntimeError('Use toys in context manager')
+        key = None
+        if self.coalesce:
+            identity = self._coalesced_commands.get((packet.did, packet.cid))
+            if identity is not None:
+                key = packet.did, packet.cid, getattr(packet, 'tid', None), bytes(packet.data[:identity])
+        payload = packet.build()
+        if future is not None:
+            future.payload = payload
+        replaced = self.__packet_queue.put((payload, future), key)
+        self.metrics.on_queue_depth(self.__packet_queue.qsize())
+        if replaced is not None and replaced[1] is not None:
+            self.__supersede(replaced[1], future)
+
+    def __supersede(self, old, new):
+        """Completes the future of a packet replaced in the queue before being sent, with the response of the packet
+        replacing it."""
+        if not self.__unregister(old) or not old.set_running_or_notify_cancel():
+            return
+        if new is None:
+            old.set_result(None)
+            return
+
+        def forward(f):
+            if f.exception() is not None:
+                old.set_exception(f.exception())
+            else:
+                old.set_result(f.result())
+
+        new.add_done_callback(forward)
+
+    @property
+    def safe_rate(self) -> float:
+        """Command rate, in packets per second, currently considered safe for this toy by the write pacer."""
+        return self.pacer.rate
+
+    def set_response_mode(self, commands: Type[Commands], mode: ResponseModes, cid: int = None):
+        """Sets how commands of the given command set (or only command ``cid`` of it) are answered. With
+        :attr:`ResponseModes.ONLY_ERROR` or :attr:`ResponseModes.NONE`, the commands return ``None`` immediately
+        instead of waiting for the response, and failures are reported to command error listeners."""
+        key = (commands._did, cid)
+        if mode == ResponseModes.ALL:
+            self.__response_modes.pop(key, None)
+        else:
+            self.__response_modes[key] = mode
+
+    @contextmanager
+    def response_mode(self, mode: ResponseModes):
+        """Overrides the response mode of all commands issued from the current thread within this context."""
+        previous = getattr(self.__local, 'response_mode', None)
+        self.__local.response_mode = mode
+        try:
+            yield
+        finally:
+            self.__local.response_mode = previous
+
+    def __response_mode(self, packet):
+        mode = getattr(self.__local, 'response_mode', None)
+        if mode is not None:
+            return mode
+        if not self.__response_modes:
+            return ResponseModes.ALL
+        return self.__response_modes.get((packet.did, packet.cid),
+                                         self.__response_modes.get((packet.did, None), ResponseModes.ALL))
+
+    def add_command_error_listener(self, listener: Callable[[Exception], None]):
+        """Registers a listener called with the error of failed commands that no one is waiting for, such as
+        commands sent with :attr:`ResponseModes.ONLY_ERROR`, or with the adapter error when writing them failed."""
+        self.__error_listeners.add(listener)
+
+    def remove_command_error_listener(self, listener: Callable[[Exception], None]):
+        self.__error_listeners.remove(listener)
+
+    @contextmanager
+    def pipelined(self):
+        """Within this context, commands issued from the current thread return a :class:`PendingPacket` instead of
+        waiting for the response, so many requests can be in flight at once. On exit, waits for all of them and
+        raises the first error, if any: a timeout, or a :class:`CommandExecuteError` for a response reporting
+        failure."""
+        if getattr(self.__local, 'pending', None) is not None:
+            yield self.__local.pending
+            return
+        pending: List[PendingPacket] = []
+        self.__local.pending = pending
+        try:
+            yield pending
+        finally:
+            self.__local.pending = None
+        error = None
+        for future in pending:
+            try:
+                packet = future.result(max(0., future.deadline - time.monotonic()))
+                if packet is not None and hasattr(packet, 'check_error'):
+                    packet.check_error()
+            except futures.TimeoutError as e:
+                self.__expire(future)
+                error = error or e
+            except CommandExecuteError as e:
+                error = error or e
+        if error is not None:
+            raise error
 
     def _wait_packet(self, key, timeout=10.0, check_error=False):
         future = futures.Future()
-        self.__waiting[key].put(future)
-        packet = future.result(timeout)
+        self.__register(key, future)
+        try:
+            packet = future.result(timeout)
+        except futures.TimeoutError:
+            self.__expire(future)
+            raise
         if check_error:
             packet.check_error()
         return packet
 
+    def __register(self, key, future):
+        with self.__waiting_lock:
+            self.__waiting[key].append(future)
+
+    def __unregister(self, future):
+        with self.__waiting_lock:
+            for key, queue in self.__waiting.items():
+                if future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self.__waiting[key]
+                    return True
+        return False
+
+    def __expire(self, future):
+        if not self.__unregister(future):
+            return
+        if future.set_running_or_notify_cancel():
+            future.set_exception(futures.TimeoutError())
+            self.metrics.on_timeout()
+            if isinstance(future, PendingPacket):
+                self.pacer.on_timeout()
+
+    def __in_flight(self) -> int:
+        with self.__waiting_lock:
+            return sum(len(queue) for queue in self.__waiting.values())
+
+    def __dispatch_lag(self):
+        stats = getattr(self.dispatcher, 'stats', None)
+        return getattr(stats(), 'lag', None) if stats is not None else None
+
+    def __expire_stale(self):
+        now = time.monotonic()
+        with self.__waiting_lock:
+            stale = [f for queue in self.__waiting.values() for f in queue
+                     if isinstance(f, PendingPacket) and f.deadline < now]
+        for future in stale:
+            self.__expire(future)
+
     def _add_listener(self, key, listener: Callable):
         self.__listeners[key[0]][listener] = partial(key[1], listener)
 
@@ -138,16 +426,61 @@ class Toy:
         self.__listeners[key[0]].pop(listener)
 
     def __api_read(self, char, data):
-        self.__decoder.add(data)
+        self.metrics.on_read(len(data))
+        try:
+            self.__decoder.add(data)
+        except PacketDecodingException:
+            self.metrics.on_decoder_error()
+            raise
 
     def __new_packet(self, packet):
         # print('response ' + ' '.join([hex(c) for c in packet.build()]))
         key = packet.id
-        queue = self.__waiting[key]
-        while not queue.empty():
-            queue.get().set_result(packet)
+        with self.__waiting_lock:
+            queue = self.__waiting.pop(key, [])
+        answered = bool(queue)
+        busy = getattr(packet, 'err', None) == PacketV2.Error.busy
+        if busy:
+            self.pacer.on_busy()
+            self.metrics.on_busy()
+            queue = self.__retry_busy(key, queue)
+        if not answered:
+            self.metrics.on_notification(key[:2])
+        now = time.monotonic()
+        for future in queue:
+            if not busy and getattr(future, 'sent_at', None) is not None:
+                self.pacer.on_response(now - future.sent_at)
+                if getattr(future, 'command', None) is not None:
+                    self.metrics.on_response(future.command, now - future.sent_at)
+            if not future.set_running_or_notify_cancel():
+                continue
+            if busy:
+                future.set_exception(CommandExecuteError(packet.err))
+            else:
+                future.set_result(packet)
+        if not answered and self.__error_listeners and hasattr(packet, 'check_error'):
+            try:
+                packet.check_error()
+            except CommandExecuteError as e:
+                for f in self.__error_listeners:
+                    self.dispatcher.dispatch(f, e)
         for f in self.__listeners[key].values():
-            threading.Thread(target=f, args=(packet,)).start()
+            self.dispatcher.dispatch(f, packet)
+
+    def __retry_busy(self, key, queue):
+        """Queues the commands the toy was too busy to take again, at most ``busy_retries`` times each, returning
+        those that are not retried."""
+        failed = []
+        for future in queue:
+            if isinstance(future, PendingPacket) and future.payload is not None and \
+                    future.retries < self.busy_retries and not future.done() and self.__adapter is not None:
+                future.retries += 1
+                future.sent_at = None
+                self.__register(key, future)
+                self.__packet_queue.put((future.payload, future))
+            else:
+                failed.append(future)
+        return failed
 
     @classmethod
     def implements(cls, method, with_target=False):